@@ -1,14 +1,87 @@
-from re import sub
-
+from io import StringIO
+from os import cpu_count
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
 from pathlib import Path
 from argparse import ArgumentParser
 
 from colorama import Fore
+from lark.exceptions import UnexpectedInput, VisitError
 
 from hdltree.symbol import to_symbol
 
 from hdltree import Parser, Analyzer
 
+# lowercases and deletes whitespace in one pass, files are read as latin-1 so every character is covered
+LOWER_NO_WS = str.maketrans(
+    {c: None for c in map(chr, range(256)) if c.isspace()}
+    | {c: c.lower() for c in map(chr, range(256)) if c.isupper()}
+)
+
+
+# yield each nonempty line lowercased, with comments and whitespace removed
+def normalize(lines):
+    for line in lines:
+        if line := line.split("--", 1)[0].translate(LOWER_NO_WS):
+            yield line
+
+
+# return the offset where two streams of normalized text first differ, or None if they're the same
+def first_mismatch(a, b):
+    a, b = iter(a), iter(b)
+    abuf = bbuf = ""
+    offset = 0
+    while True:
+        abuf = abuf or next(a, None)
+        bbuf = bbuf or next(b, None)
+        if abuf is None or bbuf is None:
+            return None if abuf is bbuf else offset
+        n = min(len(abuf), len(bbuf))
+        if abuf[:n] != bbuf[:n]:
+            return offset + next(i for i in range(n) if abuf[i] != bbuf[i])
+        abuf, bbuf = abuf[n:], bbuf[n:]
+        offset += n
+
+
+# parser used by the worker processes, forked workers inherit the one set up by the main process
+hdl_parser = None
+
+
+# workers that weren't forked build their own parser once
+def init_worker():
+    global hdl_parser
+    if hdl_parser is None:
+        hdl_parser = Parser.HdlParser()
+
+
+# parse a file, check the round trip and draw its symbols
+# returns the CST and the report for the main process to print in order
+# lark's errors can't be sent back from a worker, so a failed parse is reported with no CST
+def process(f):
+    try:
+        cst = hdl_parser.parse_file(f)
+    except (UnexpectedInput, VisitError) as e:
+        return None, [f"{Fore.RED}parse failed: {f.name}{Fore.RESET}", str(Parser.ParseFileError.from_lark(f, e))]
+    report = []
+
+    # compare line by line, only building the full normalized text if there's a difference to show
+    with open(f, encoding="latin-1") as fh:
+        mismatch = first_mismatch(normalize(fh), normalize(StringIO(str(cst))))
+
+    if mismatch is not None:
+        report.append(f"{Fore.RED}inexact recreation: {f.name}{Fore.RESET}")
+        txt = "".join(normalize(f.read_text("latin-1").splitlines()))
+        csttxt = "".join(normalize(str(cst).splitlines()))
+        report.append(txt[mismatch:])
+        report.append(csttxt[mismatch:])
+    else:
+        report.append(f"{Fore.GREEN}more or less exact recreation: {f.name}{Fore.RESET}")
+
+    for ent in cst.entities:
+        to_symbol(ent)
+
+    return cst, report
+
 
 if __name__ == "__main__":
     parser = ArgumentParser(description="Pure Python HDL parser")
@@ -33,26 +106,16 @@ if __name__ == "__main__":
 
     files = Parser.collect_files(args.input, args.exclude)
     proj = Analyzer.Project()
-    proj.add_library("src")
+    lib = proj.add_library("src")
 
-    for f in files:
-        cst = proj.add_file("src", f)
-
-        txt = f.read_text("latin-1").lower()
-        csttxt = str(cst).lower()
-
-        txt = sub(r"--.*", r"", txt)
-        csttxt = sub(r"--.*", r"", csttxt)
-
-        txt = sub(r"\s+", "", txt).strip()
-        csttxt = sub(r"\s+", "", csttxt).strip()
-
-        if txt != csttxt:
-            print(f"{Fore.RED}inexact recreation: {f.name}{Fore.RESET}")
-            print(txt)
-            print(csttxt)
-        else:
-            print(f"{Fore.GREEN}more or less exact recreation: {f.name}{Fore.RESET}")
+    # share the project's parser with forked workers instead of compiling the grammar in each of them
+    hdl_parser = proj.parser
+    ctx = get_context("fork") if "fork" in get_all_start_methods() else None
 
-        for ent in cst.entities:
-            to_symbol(ent)
+    # files are independent until they're added to the library, so parse them in parallel
+    # and add the results in the original order
+    with ProcessPoolExecutor(max_workers=cpu_count(), mp_context=ctx, initializer=init_worker) as pool:
+        for cst, report in pool.map(process, files, chunksize=4):
+            if cst is not None:
+                lib.add_cst(cst)
+            print("\n".join(report))
@@ -5,15 +5,29 @@
 
 import ast
 import io
+import json
 import os
-import re
-from pprint import pprint
-from typing import Any, Dict, List, Optional, Set
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from hdltree import Parser
 from hdltree.VhdlCstTransformer import *
 
-parser = Parser.HdlParser()
+
+# building the parser compiles the grammar, so wait until something actually needs to be parsed
+@lru_cache(maxsize=None)
+def _get_parser():
+    return Parser.HdlParser()
+
+
+# parsed object lists keyed by a digest of the source text, least recently used first
+_parse_cache: OrderedDict[str, list] = OrderedDict()
+_PARSE_CACHE_SIZE = 256
+
 
 class VhdlObject:
     """Base class for parsed VHDL objects
@@ -23,6 +37,8 @@ class VhdlObject:
       desc (str): Description from object metacomments
     """
 
+    __slots__ = ('name', 'kind', 'desc')
+
     def __init__(self, name, desc=None):
         self.name = name
         self.kind = 'unknown'
@@ -31,9 +47,17 @@ class VhdlObject:
 
 def remove_outer_parenthesis(s: Optional[str]):
     if s:
-        n = 1
-        while n:
-            s, n = re.subn(r'\([^()]*\)', '', s.strip())  # remove non-nested/flat balanced parts
+        # single pass dropping balanced parentheses, one buffer per open '('
+        # so that the text after a '(' that is never closed is kept as-is
+        kept = [[]]
+        for ch in s.strip():
+            if ch == '(':
+                kept.append([ch])
+            elif ch == ')' and len(kept) > 1:
+                kept.pop()
+            else:
+                kept[-1].append(ch)
+        s = ''.join(''.join(part) for part in kept).strip()
     return s
 
 
@@ -48,9 +72,11 @@ class VhdlParameterType:
       arange (str): Original array range string
     """
 
+    __slots__ = ('name', 'direction', 'r_bound', 'l_bound', 'arange')
+
     def __init__(self, name, direction="", r_bound="", l_bound="", arange=""):
         self.name = name
-        self.direction = direction.lower().strip()
+        self.direction = sys.intern(direction.lower().strip())
         self.r_bound = r_bound
         self.l_bound = l_bound
         self.arange = arange
@@ -71,6 +97,8 @@ class VhdlParameter:
       param_desc (optional str): Description of the parameter
     """
 
+    __slots__ = ('name', 'mode', 'data_type', 'default_value', 'desc', 'param_desc')
+
     def __init__(self, name, mode: Optional[str] = None, data_type: Optional[VhdlParameterType] = None, default_value: Optional[str] = None, desc: Optional[str] = None):
         self.name = name
         self.mode = mode
@@ -80,18 +108,18 @@ class VhdlParameter:
         self.param_desc = None
 
     def __str__(self):
+        parts = [self.name, " : "]
         if self.mode is not None:
-            param = f"{self.name} : {self.mode} {self.data_type.name + self.data_type.arange}"
-        else:
-            param = f"{self.name} : {self.data_type.name + self.data_type.arange}"
+            parts += (self.mode, " ")
+        parts += (self.data_type.name, self.data_type.arange)
 
         if self.default_value is not None:
-            param = f"{param} := {self.default_value}"
+            parts += (" := ", self.default_value)
 
         if self.param_desc is not None:
-            param = f"{param} --{self.param_desc}"
+            parts += (" --", self.param_desc)
 
-        return param
+        return "".join(parts)
 
     def __repr__(self):
         return f"VhdlParameter('{self.name}', '{self.mode}', '{self.data_type.name + self.data_type.arange}')"
@@ -105,6 +133,8 @@ class VhdlPackage(VhdlObject):
       desc (str): Description from object metacomments
     """
 
+    __slots__ = ()
+
     def __init__(self, name, desc=None):
         VhdlObject.__init__(self, name, desc)
         self.kind = 'package'
@@ -120,6 +150,8 @@ class VhdlType(VhdlObject):
       desc (str, optional): Description from object metacomments
     """
 
+    __slots__ = ('package', 'type_of')
+
     def __init__(self, name, package, type_of, desc=None):
         VhdlObject.__init__(self, name, desc)
         self.kind = 'type'
@@ -140,6 +172,8 @@ class VhdlSubtype(VhdlObject):
       desc (str, optional): Description from object metacomments
     """
 
+    __slots__ = ('package', 'base_type')
+
     def __init__(self, name, package, base_type, desc=None):
         VhdlObject.__init__(self, name, desc)
         self.kind = 'subtype'
@@ -160,6 +194,8 @@ class VhdlConstant(VhdlObject):
       desc (str, optional): Description from object metacomments
     """
 
+    __slots__ = ('package', 'base_type')
+
     def __init__(self, name, package, base_type, desc=None):
         VhdlObject.__init__(self, name, desc)
         self.kind = 'constant'
@@ -181,6 +217,8 @@ class VhdlFunction(VhdlObject):
       desc (str, optional): Description from object metacomments
     """
 
+    __slots__ = ('package', 'parameters', 'return_type')
+
     def __init__(self, name, package, parameters, return_type=None, desc=None):
         VhdlObject.__init__(self, name, desc)
         self.kind = 'function'
@@ -202,6 +240,8 @@ class VhdlProcedure(VhdlObject):
       desc (str, optional): Description from object metacomments
     """
 
+    __slots__ = ('package', 'parameters')
+
     def __init__(self, name, package, parameters, desc=None):
         VhdlObject.__init__(self, name, desc)
         self.kind = 'procedure'
@@ -223,6 +263,8 @@ class VhdlEntity(VhdlObject):
       desc (str, optional): Description from object metacomments
     """
 
+    __slots__ = ('generics', 'ports', 'sections')
+
     def __init__(self, name: str, ports: List[VhdlParameter], generics: Optional[List[VhdlParameter]] = None, sections: Optional[List[str]] = None, desc: Optional[str] = None):
         VhdlObject.__init__(self, name, desc)
         self.kind = 'entity'
@@ -251,6 +293,8 @@ class VhdlComponent(VhdlObject):
       desc (str, optional): Description from object metacomments
     """
 
+    __slots__ = ('package', 'generics', 'ports', 'sections')
+
     def __init__(self, name, package, ports, generics=None, sections=None, desc=None):
         VhdlObject.__init__(self, name, desc)
         self.kind = 'component'
@@ -268,6 +312,11 @@ class VhdlComponent(VhdlObject):
             print(f"\t{port.name} ({type(port.name)}), {port.data_type} ({type(port.data_type)})")
 
 
+def _read_source(fname):
+    with io.open(fname, 'rt', encoding='latin-1') as fh:
+        return fh.read()
+
+
 def parse_vhdl_file(fname):
     """Parse a named VHDL file
 
@@ -276,167 +325,156 @@ def parse_vhdl_file(fname):
     Returns:
       Parsed objects.
     """
-    with open(fname, 'rt', encoding='latin-1') as fh:
-        text = fh.read()
-    return parse_vhdl(text)
+    return parse_vhdl(_read_source(fname))
+
+
+def _ptype_args(si):
+    """Format the parameter type of an interface declaration
+
+    Args:
+      si (SubtypeIndication): Subtype of the declaration
+    Returns:
+      VhdlParameterType arguments with the range of the first index constraint, if any.
+    """
+    # the same few type marks show up all over a design, keep one copy of each
+    type_mark = sys.intern(str(si.type_mark))
+    constraint = si.constraint
+    if constraint and isinstance(constraint.constraint, ArrayConstraint):
+        rng = constraint.constraint.index_constraint.discrete_ranges[0].range
+        return type_mark, rng.direction, str(rng.right), str(rng.left), str(rng)
+    return (type_mark,)
+
+
+def _extract_params(decls):
+    """Build the parameters of a sequence of interface declarations
+
+    Args:
+      decls (iterable of interface declarations): Declarations to convert
+    Returns:
+      List of VhdlParameter, one per declared identifier.
+    """
+    params = []
+    for decl in decls:
+        # everything but the name is the same for all identifiers of a declaration, so format it
+        # once. each parameter still gets its own VhdlParameterType since those are mutable
+        default = str(decl.default) if decl.default else None
+        mode = sys.intern(str(decl.mode)) if decl.mode else "in"
+        ptype_args = _ptype_args(decl.subtype_indication)
+        params.extend(
+            VhdlParameter(str(id), mode, VhdlParameterType(*ptype_args), default)
+            for id in decl.identifier_list
+        )
+    return params
 
 
 def parse_vhdl(text):
     """Parse a text buffer of VHDL code
 
+    Identical sources are only parsed once, later calls get a copy of the cached objects.
+
     Args:
       text(str): Source code to parse
     Returns:
       Parsed objects.
     """
-    cst = parser.parse(text, "VHDL")
+    key = Parser.source_digest(text)
+    if key in _parse_cache:
+        _parse_cache.move_to_end(key)
+    else:
+        _parse_cache[key] = _parse_vhdl(text)
+        if len(_parse_cache) > _PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return deepcopy(_parse_cache[key])
+
+
+# Handlers turning a CST node into hdlparse objects
+# each takes the node and the name of the enclosing package and yields the objects it declares
+
+
+def _subprogram_objects(node, cur_package):
+    spec = node.specification.specification
+    name = str(spec.designator)
+    parameters = []
+    if plist := spec.formal_parameter_list:
+        parameters = _extract_params(
+            p.parameter_declaration for p in plist
+            if not isinstance(p.parameter_declaration, InterfaceFileDeclaration)
+        )
+
+    if isinstance(spec, ProcedureSpecification):
+        yield VhdlProcedure(name, cur_package, parameters)
+    else:
+        yield VhdlFunction(name, cur_package, parameters, str(spec.type_mark))
+
+
+def _entity_objects(node, cur_package):
+    generics = None
+    if genclause := node.entity_header.generic_clause:
+        generics = _extract_params(
+            e.generic_declaration for e in genclause.interface_elements
+            if isinstance(e.generic_declaration, InterfaceConstantDeclaration)
+        )
+
+    ports = []
+    if portclause := node.entity_header.port_clause:
+        ports = _extract_params(e.port_declaration for e in portclause.interface_elements)
+
+    yield VhdlEntity(str(node.identifier), ports, generics)
+
+
+def _component_objects(node, cur_package):
+    generics = None
+    if genclause := node.local_generic_clause:
+        generics = _extract_params(e.generic_declaration for e in genclause.interface_elements)
+
+    ports = []
+    if portclause := node.local_port_clause:
+        ports = _extract_params(e.port_declaration for e in portclause.interface_elements)
+
+    yield VhdlComponent(str(node.identifier), cur_package, ports, generics)
+
+
+def _package_objects(node, cur_package):
+    yield VhdlPackage(str(node.identifier))
+
+
+def _type_objects(node, cur_package):
+    yield VhdlType(str(node.identifier), cur_package, str(node.type_definition))
+
+
+def _subtype_objects(node, cur_package):
+    yield VhdlSubtype(str(node.identifier), cur_package, str(node.subtype_indication.type_mark))
+
+
+def _constant_objects(node, cur_package):
+    if isinstance(node.parent, PackageDeclarativeItem):
+        for id in node.identifiers:
+            yield VhdlConstant(str(id.id), cur_package, str(node.subtype_indication))
+
+
+# looked up by the exact node type, none of these CST classes are subclassed
+_OBJECT_HANDLERS = {
+    SubprogramDeclaration: _subprogram_objects,
+    EntityDeclaration: _entity_objects,
+    ComponentDeclaration: _component_objects,
+    PackageDeclaration: _package_objects,
+    FullTypeDeclaration: _type_objects,
+    SubtypeDeclaration: _subtype_objects,
+    ConstantDeclaration: _constant_objects,
+}
+
+
+def _parse_vhdl(text):
+    cst = _get_parser().parse(text, "VHDL")
 
     objects = []
     cur_package = "defaultpkg"
 
     for node in cst.iter_subtrees():
-        if isinstance(node, SubprogramDeclaration):
-            spec = node.specification.specification
-            if isinstance(spec, ProcedureSpecification):
-                kind = 'procedure'
-            else:
-                kind = 'function'
-            name = str(spec.designator)
-            parameters = []
-            if plist := spec.formal_parameter_list:
-                for param in plist:
-                    decl = param.parameter_declaration
-                    if not isinstance(decl, InterfaceFileDeclaration):
-                        for id in decl.identifier_list:
-                            default = None
-                            if decl.default:
-                                default = str(decl.default)
-                            if decl.subtype_indication.constraint and isinstance(decl.subtype_indication.constraint.constraint, ArrayConstraint):
-                                ptype = VhdlParameterType(
-                                    str(decl.subtype_indication.type_mark),
-                                    decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.direction,
-                                    str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.right),
-                                    str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.left),
-                                    str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range)
-                                )
-                            else:
-                                ptype = VhdlParameterType(str(decl.subtype_indication.type_mark))
-                            parameters += [VhdlParameter(str(id), str(decl.mode) if decl.mode else "in", ptype, default)]
-
-            if kind == 'function':
-                vobj = VhdlFunction(name, cur_package, parameters, str(spec.type_mark))
-            else:
-                vobj = VhdlProcedure(name, cur_package, parameters)
-            objects.append(vobj)
-
-        elif isinstance(node, EntityDeclaration):
-            if genclause := node.entity_header.generic_clause:
-                generics = []
-                for elem in genclause.interface_elements:
-                    decl = elem.generic_declaration
-                    if isinstance(decl, InterfaceConstantDeclaration):
-                        for id in decl.identifier_list:
-                            default = None
-                            if decl.default:
-                                default = str(decl.default)
-                            if decl.subtype_indication.constraint and isinstance(decl.subtype_indication.constraint.constraint, ArrayConstraint):
-                                ptype = VhdlParameterType(
-                                    str(decl.subtype_indication.type_mark),
-                                    decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.direction,
-                                    str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.right),
-                                    str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.left),
-                                    str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range)
-                                )
-                            else:
-                                ptype = VhdlParameterType(str(decl.subtype_indication.type_mark))
-                            generics += [VhdlParameter(str(id), str(decl.mode) if decl.mode else "in", ptype, default)]
-            else:
-                generics = None
-
-            ports = []
-            if portclause := node.entity_header.port_clause:
-                for elem in portclause.interface_elements:
-                    decl = elem.port_declaration
-                    for id in decl.identifier_list:
-                        default = None
-                        if decl.default:
-                            default = str(decl.default)
-                        if decl.subtype_indication.constraint and isinstance(decl.subtype_indication.constraint.constraint, ArrayConstraint):
-                            ptype = VhdlParameterType(
-                                str(decl.subtype_indication.type_mark),
-                                decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.direction,
-                                str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.right),
-                                str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.left),
-                                str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range)
-                            )
-                        else:
-                            ptype = VhdlParameterType(str(decl.subtype_indication.type_mark))
-                        ports += [VhdlParameter(str(id), str(decl.mode) if decl.mode else "in", ptype, default)]
-
-            vobj = VhdlEntity(str(node.identifier), ports, generics)
-            objects.append(vobj)
-
-        elif isinstance(node, ComponentDeclaration):
-            if genclause := node.local_generic_clause:
-                generics = []
-                for elem in genclause.interface_elements:
-                    decl = elem.generic_declaration
-                    for id in decl.identifier_list:
-                        default = None
-                        if decl.default:
-                            default = str(decl.default)
-                        if decl.subtype_indication.constraint and isinstance(decl.subtype_indication.constraint.constraint, ArrayConstraint):
-                            ptype = VhdlParameterType(
-                                str(decl.subtype_indication.type_mark),
-                                decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.direction,
-                                str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.right),
-                                str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.left),
-                                str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range)
-                            )
-                        else:
-                            ptype = VhdlParameterType(str(decl.subtype_indication.type_mark))
-                        generics += [VhdlParameter(str(id), str(decl.mode) if decl.mode else "in", ptype, default)]
-            else:
-                generics = None
-
-            ports = []
-            if portclause := node.local_port_clause:
-                for elem in portclause.interface_elements:
-                    decl = elem.port_declaration
-                    for id in decl.identifier_list:
-                        default = None
-                        if decl.default:
-                            default = str(decl.default)
-                        if decl.subtype_indication.constraint and isinstance(decl.subtype_indication.constraint.constraint, ArrayConstraint):
-                            ptype = VhdlParameterType(
-                                str(decl.subtype_indication.type_mark),
-                                decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.direction,
-                                str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.right),
-                                str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range.left),
-                                str(decl.subtype_indication.constraint.constraint.index_constraint.discrete_ranges[0].range)
-                            )
-                        else:
-                            ptype = VhdlParameterType(str(decl.subtype_indication.type_mark))
-                        ports += [VhdlParameter(str(id), str(decl.mode) if decl.mode else "in", ptype, default)]
-            vobj = VhdlComponent(str(node.identifier), cur_package, ports, generics)
-            objects.append(vobj)
-
-        elif isinstance(node, PackageDeclaration):
-            cur_package = str(node.identifier)
-            objects.append(VhdlPackage(cur_package))
-
-        elif isinstance(node, (FullTypeDeclaration, SubtypeDeclaration)):
-            vobj = VhdlType(str(node.identifier), cur_package, str(node.children[1]))
-            objects.append(vobj)
-
-        elif isinstance(node, SubtypeDeclaration):
-            vobj = VhdlSubtype(str(node.identifier), cur_package, str(node.subtype_indication))
-            objects.append(vobj)
-
-        elif isinstance(node, ConstantDeclaration):
-            if isinstance(node.parent, PackageDeclarativeItem):
-              for id in node.identifiers:
-                vobj = VhdlConstant(str(id.id), cur_package, str(node.subtype_indication))
+        if handler := _OBJECT_HANDLERS.get(type(node)):
+            for vobj in handler(node, cur_package):
+                if type(vobj) is VhdlPackage:
+                    cur_package = vobj.name
                 objects.append(vobj)
 
     return objects
@@ -478,11 +516,11 @@ def subprogram_signature(vo, fullname=None):
     if fullname is None:
         fullname = vo.name
 
+    plist = ','.join([p.data_type.name for p in vo.parameters])
+
     if isinstance(vo, VhdlFunction):
-        plist = ','.join(p.data_type for p in vo.parameters)
         sig = f"{fullname}[{plist} return {vo.return_type}]"
     else:  # procedure
-        plist = ','.join(p.data_type for p in vo.parameters)
         sig = f"{fullname}[{plist}]"
 
     return sig
@@ -496,7 +534,7 @@ def is_vhdl(fname):
     Returns:
       True when file has a VHDL extension.
     """
-    return os.path.splitext(fname)[-1].lower() in ('.vhdl', '.vhd')
+    return str(fname).lower().endswith(('.vhdl', '.vhd'))
 
 
 class VhdlExtractor:
@@ -511,34 +549,47 @@ class VhdlExtractor:
                                 'signed', 'unsigned', 'bit_vector'))
         if array_types:
             self.array_types |= array_types
-        self.object_cache: Dict[str, Any] = {}  # Any -> VhdlObject
+        # file name -> ((mtime, size) when it was parsed, objects)
+        self.object_cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}  # Any -> VhdlObject
 
-    def extract_objects(self, fname, type_filter=None):
+    def _cached_objects(self, fname):
+        """Look up the objects of a file that hasn't changed since it was parsed
+
+        Args:
+          fname (str): File to look up
+        Returns:
+          List of parsed objects, or None if the file needs to be parsed again, and the file's stamp.
+        """
+        # one entry per file, replaced when the file is modified so stale entries are never returned
+        st = os.stat(fname)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self.object_cache.get(fname)
+        if cached is not None and cached[0] == stamp:
+            return cached[1], stamp
+        return None, stamp
+
+    def extract_objects(self, fname, type_filter=None, text=None):
         """Extract objects from a source file
 
         Args:
           fname (str): File to parse
           type_filter (class, optional): Object class to filter results
+          text (str, optional): Contents of the file if it was already read
         Returns:
           List of parsed objects.
         """
-        objects = []
-        if fname in self.object_cache:
-            objects = self.object_cache[fname]
-        else:
-            with io.open(fname, 'rt', encoding='latin-1') as fh:
-                text = fh.read()
-                objects = parse_vhdl(text)
-                self.object_cache[fname] = objects
-                self._register_array_types(objects)
+        objects, stamp = self._cached_objects(fname)
+        if objects is None:
+            if text is None:
+                text = _read_source(fname)
+            objects = parse_vhdl(text)
+            self.object_cache[fname] = (stamp, objects)
+            self._register_array_types(objects)
 
         if type_filter:
-            if not isinstance(type_filter, list):
-                type_filter = [type_filter]
-
-            def type_is_in_filter(obj):
-                return any(map(lambda clz: isinstance(obj, clz), type_filter))
-            objects = [o for o in objects if type_is_in_filter(o)]
+            if isinstance(type_filter, list):
+                type_filter = tuple(type_filter)
+            objects = [o for o in objects if isinstance(o, type_filter)]
 
         return objects
 
@@ -589,9 +640,13 @@ class VhdlExtractor:
             type_defs = fh.read()
 
         try:
-            type_defs = ast.literal_eval(type_defs)
-        except SyntaxError:
-            type_defs = {}
+            type_defs = json.loads(type_defs)
+        except ValueError:
+            # files saved before the registry was written as JSON
+            try:
+                type_defs = ast.literal_eval(type_defs)
+            except SyntaxError:
+                type_defs = {}
 
         self._add_array_types(type_defs)
 
@@ -601,9 +656,9 @@ class VhdlExtractor:
         Args:
           fname (str): Name of file to save array database to
         """
-        type_defs = {'arrays': sorted(list(self.array_types))}
+        type_defs = {'arrays': sorted(self.array_types)}
         with open(fname, 'wt', encoding='latin-1') as fh:
-            pprint(type_defs, stream=fh)
+            json.dump(type_defs, fh)
 
     def _register_array_types(self, objects):
         """Add array type definitions to internal registry
@@ -611,18 +666,34 @@ class VhdlExtractor:
         Args:
           objects (list of VhdlType or VhdlSubtype): Array types to track
         """
-        # Add all array types directly
-        types = [o for o in objects if isinstance(o, VhdlType) and o.type_of == 'array_type']
-        for t in types:
-            self.array_types.add(t.name)
-
-        subtypes = {o.name: o.base_type for o in objects if isinstance(o, VhdlSubtype)}
+        # Add all array types directly and collect subtypes in the same pass
+        subtypes = {}
+        add_array_type = self.array_types.add
+        for o in objects:
+            t = type(o)
+            if t is VhdlType:
+                if o.type_of == 'array_type':
+                    add_array_type(o.name)
+            elif t is VhdlSubtype:
+                subtypes[o.name] = o.base_type
+
+        # Base type at the end of each subtype chain, filled in as chains are followed
+        # so every subtype is only visited once
+        roots = {}
+
+        def root(name):
+            path = []
+            while name in subtypes and name not in roots:  # Follow subtypes of subtypes
+                path.append(name)
+                name = subtypes[name]
+            base = roots.get(name, name)
+            for p in path:
+                roots[p] = base
+            return base
 
         # Find all subtypes of an array type
-        for k, v in subtypes.items():
-            while v in subtypes:  # Follow subtypes of subtypes
-                v = subtypes[v]
-            if v in self.array_types:
+        for k in subtypes:
+            if root(k) in self.array_types:
                 self.array_types.add(k)
 
     def register_array_types_from_sources(self, source_files):
@@ -631,9 +702,26 @@ class VhdlExtractor:
         Args:
           source_files (list of str): Files to parse for array definitions
         """
-        for fname in source_files:
-            if is_vhdl(fname):
-                self._register_array_types(self.extract_objects(fname))
+        fnames = [f for f in source_files if is_vhdl(f)]
+
+        # files that are still cached don't need to be read at all
+        stale = iter(dict.fromkeys(f for f in fnames if self._cached_objects(f)[0] is None))
+
+        # read the next stale file in the background while the current one is parsed
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            pending = {}
+
+            def prefetch():
+                if (f := next(stale, None)) is not None:
+                    pending[f] = reader.submit(_read_source, f)
+
+            prefetch()
+            for fname in fnames:
+                text = None
+                if fname in pending:
+                    text = pending.pop(fname).result()
+                    prefetch()
+                self._register_array_types(self.extract_objects(fname, text=text))
 
 
 def main():
@@ -2,25 +2,35 @@ from __future__ import annotations  # for forward annotations
 
 from typing import List, Set, Tuple, TypeAlias
 from dataclasses import field, fields
+from functools import lru_cache
 from os import getenv
-from pathlib import Path
+from pathlib import Path, PurePath
 from lark import Tree as LarkTree
-from sys import modules
-from re import sub
+import sys
+from sys import intern
 from types import SimpleNamespace
 from dataclasses import InitVar
 from io import TextIOBase
 from rich.console import Console
+from rich.markup import escape
+from rich.tree import Tree as RichTree
 from json import dumps, loads
 from lark.exceptions import UnexpectedCharacters, VisitError
 from time import time
 
 import hdltree.VhdlCstTransformer as VhdlCst
 from hdltree.Parser import HdlParser
+from hdltree.treeutils import (
+    annotate_type,
+    camel2snake,
+    deref_type,
+    list_item_type,
+    rich_label,
+)
 
 
-if getenv("DEBUG"):
-    # check datatypes with pydantic, somewhat slower
+if getenv("HDLTREE_VALIDATE") == "1":
+    # check datatypes with pydantic, much slower since every field of every node is validated
     from pydantic import ConfigDict
     from pydantic.dataclasses import dataclass
 
@@ -31,110 +41,113 @@ else:
     dataclass = dataclass(slots=True)
 
 
-def camel2snake(name):
-    return sub(r"([a-z])([A-Z])", r"\1_\2", name).lower()
-
-
 def nonestr(val):
     return str(val) if val is not None else None
 
 
+# the name and fields of a class never change, so only look them up once per class.
+# the lookup tables tagged as indexes aren't part of the tree
+@lru_cache(maxsize=None)
+def tree_info(cls):
+    return camel2snake(cls.__name__), tuple(f for f in fields(cls) if not f.metadata.get("index"))
+
+
+# values shown as a single leaf in rich_tree
+@lru_cache(maxsize=None)
+def is_leaf_type(cls):
+    return cls is type(None) or issubclass(cls, (str, PurePath, bool, VhdlCst.Identifier))
+
+
+INDENT_TOKEN = "  "
+INDENTS = tuple(INDENT_TOKEN * num for num in range(64))
+
+
 @dataclass
 class Tree:
     # print a simple version of the CST, probably prefer rich_tree
     def print(self, level=0):
-        INDENT_TOKEN = "  "
+        buf = []
+        self.print_lines(buf, level)
+        sys.stdout.write("\n".join(buf) + "\n")
+
+    # append the lines of print to buf
+    def print_lines(self, buf, level=0):
+        # walk with an explicit stack of nodes in progress so deep trees don't hit the recursion limit
+        stack = [self.print_node(buf, level)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+            else:
+                stack.append(child[0].print_node(buf, child[1]))
 
+    # append the lines of this node to buf, yielding each child node and its level to be printed in turn
+    def print_node(self, buf, level):
         def indent(num):
-            return INDENT_TOKEN * num
+            return INDENTS[num] if num < len(INDENTS) else INDENT_TOKEN * num
 
-        print(indent(level) + camel2snake(type(self).__name__))
-        for f in fields(self):
+        snake, tree_fields = tree_info(type(self))
+        buf.append(indent(level) + snake)
+        for f in tree_fields:
             fobj = getattr(self, f.name)
             # if isinstance(fobj, Meta):
             #    continue
+            # every field is printed one level under this node, list items one more under the field name
             if not isinstance(fobj, list):
                 fobj = [fobj]
+                child_level = level + 1
             else:
-                level += 1
-                print(indent(level) + f.name)
+                buf.append(indent(level + 1) + f.name)
+                child_level = level + 2
             for obj in fobj:
                 if isinstance(obj, Tree):
-                    obj.print(level + 1)
+                    yield obj, child_level
                 else:
-                    level += 1
-                    print(indent(level) + str(obj))
+                    buf.append(indent(child_level) + str(obj))
 
     # return a rich.tree.Tree for pretty printing
-    def rich_tree(self, self_meta=None):
-        from rich.tree import Tree as RichTree
-        from rich.markup import escape
-
-        # expand aliases
-        def deref_type(rawtype):
-            newtype = []
-            for rt in rawtype.split(" | "):
-                try:
-                    # get a reference to the containing module
-                    thismodule = modules[self.__module__]  # __import__(__name__)
-                    # try to get the attribute, errors out here if it doesn't exist
-                    aliastype = getattr(thismodule, rt)
-                    # make sure it's an alias
-                    if not isinstance(aliastype, type):  # get_origin(uniontype):
-                        # chop off the module name and prepend the alias name
-                        nopre = sub(r"typing\.", "", str(aliastype))
-                        nopre = sub(f"{__name__}\\.", "", nopre)
-                        newtype.append(f"{{ {rt} = " + nopre + " }")
+    def rich_tree(self, self_meta=None, lazy=False):
+        # leaves are the most common fields, so check for them first
+        def leaf2tree(name, field_type, field_val):
+            annotated_type = annotate_type(field_type, field_val)
+            # token_branch = RichTree(f'{field_meta.name}{(f"[{iter}]") if iter != -1 else ""} [ {annotated_type} ]')
+            token_branch = RichTree(rich_label(f"{name} [ {annotated_type} ]"))
+            token_branch.add(
+                rich_label(f"[green]{escape(f'{field_val}') if field_val else 'None'}[/green]")
+            )
+            return token_branch
+
+        def list2tree(field_meta, field_val):
+            annotated_type = annotate_type(deref_type(field_meta.type, __name__), field_val)
+            list_branch = RichTree(
+                rich_label(f"[blue] {field_meta.name}[{len(field_val)} items] [ {annotated_type} ]")
+            )
+            list_type = list_item_type(field_meta.type, __name__)
+
+            def list_children():
+                children = []
+                for ii, list_item in enumerate(field_val):
+                    name = f"{field_meta.name}[{ii}]"
+                    if is_leaf_type(type(list_item)):
+                        children.append(leaf2tree(name, list_type, list_item))
                     else:
-                        newtype.append(rt)
-                except:
-                    newtype.append(rt)
-            return " | ".join(newtype)
-
-        # take the full type hint of the field and underline the actual type of the object in the field
-        def annotate_type(field_type, obj):
-            # remove Optional wrapper used for rules with multiple branches with different numbers of subrules/tokens and not using a Union alias
-            noopt = sub(r"Optional\[(.*)\]", r"\1", field_type)
-            # set search pattern
-            if obj is None:
-                pat = r"\b(None)\b"
-            elif isinstance(obj, list):
-                pat = r"(List\[.*\])"
-            else:
-                t = type(obj).__name__
-                if "Path" in t:
-                    t = "Path"
-                pat = r"\b(" + t + r")\b"
-            return sub(pat, r"[underline]\1[/underline]", noopt)
+                        list_meta = SimpleNamespace(name=name, type=list_type)
+                        children.extend(field2tree(list_meta, list_item))
+                return children
+
+            list_branch.children = VhdlCst.LazyChildren(list_children) if lazy else list_children()
+            return list_branch
 
         # recursively convert a CST node into a rich.tree.Tree
         def field2tree(field_meta, field_val):
-            if isinstance(field_val, (set, tuple)):
-                field_val = list(field_val)
-            if isinstance(field_val, Tree):
-                return [field_val.rich_tree(field_meta)]
+            if is_leaf_type(type(field_val)):
+                return [leaf2tree(field_meta.name, field_meta.type, field_val)]
+            elif isinstance(field_val, Tree):
+                return [field_val.rich_tree(field_meta, lazy)]
             elif isinstance(field_val, list):
-                annotated_type = annotate_type(deref_type(field_meta.type), field_val)
-                list_branch = RichTree(
-                    f"[blue] {field_meta.name}[{len(field_val)} items] [ {annotated_type} ]"
-                )
-                for ii, list_item in enumerate(field_val):
-                    list_type = sub(r"{ .* = (.*) }", r"\1", deref_type(field_meta.type))
-                    list_type = sub(r"List\[(.*)\]", r"\1", list_type)
-                    list_meta = SimpleNamespace(name=f"{field_meta.name}[{ii}]", type=list_type)
-                    for c in field2tree(list_meta, list_item):
-                        list_branch.children.append(c)
-                return [list_branch]
-            elif isinstance(field_val, (str, Path, bool, VhdlCst.Identifier)) or field_val is None:
-                annotated_type = annotate_type(field_meta.type, field_val)
-                # token_branch = RichTree(f'{field_meta.name}{(f"[{iter}]") if iter != -1 else ""} [ {annotated_type} ]')
-                token_branch = RichTree(f"{field_meta.name} [ {annotated_type} ]")
-                token_branch.add(
-                    f"[green]{escape(f'{field_val}') if field_val else 'None'}[/green]"
-                )
-                return [token_branch]
-            elif field_val is None:
-                return [RichTree("[green]None[/green]")]
+                return [list2tree(field_meta, field_val)]
+            elif isinstance(field_val, (set, tuple)):
+                return [list2tree(field_meta, list(field_val))]
             else:
                 if not isinstance(field_val, HdlParser):
                     raise ValueError(
@@ -142,22 +155,32 @@ class Tree:
                     )
                 return []
 
+        cls = type(self)
+        snake, tree_fields = tree_info(cls)
         if self_meta is None:
-            annotated_type = annotate_type(type(self).__name__, self)
-            branch = RichTree(f"{camel2snake(type(self).__name__)} [ {annotated_type} ]")
+            annotated_type = annotate_type(cls.__name__, self)
+            branch = RichTree(rich_label(f"{snake} [ {annotated_type} ]"))
         else:
             annotated_type = annotate_type(self_meta.type, self)
-            branch = RichTree(self_meta.name + f" [ {annotated_type} ]")
-        for field_meta in fields(self):
-            field_val = getattr(self, field_meta.name)
-            # if isinstance(field_val, Meta):
-            #    pass
-            # else:
-            child = field2tree(field_meta, field_val)
-            for c in child:
-                branch.children.append(c)
+            branch = RichTree(rich_label(self_meta.name + f" [ {annotated_type} ]"))
+
+        def field_children():
+            children = []
+            for field_meta in tree_fields:
+                field_val = getattr(self, field_meta.name)
+                # if isinstance(field_val, Meta):
+                #    pass
+                # else:
+                children.extend(field2tree(field_meta, field_val))
+            return children
+
+        branch.children = VhdlCst.LazyChildren(field_children) if lazy else field_children()
         return branch
 
+    # print the rich tree of this node to a rich.console.Console, only building each part of it as it gets rendered
+    def render_to(self, console):
+        console.print(self.rich_tree(lazy=True))
+
 
 @dataclass
 class Net(Tree):
@@ -192,6 +215,66 @@ class InterfacePackage(Tree):
 InterfaceElement: TypeAlias = InterfaceNet | InterfaceType | InterfaceSubprogram | InterfacePackage
 
 
+# convert an interface declaration from the CST into a list of interface elements
+# the subtype and default are shared by every identifier in the declaration, so only format them once.
+# the same few subtypes and modes come up on most ports, so the analyzed tree shares one copy of each
+def interface_constant(p):
+    subtype = intern(str(p.subtype_indication))
+    default = nonestr(p.default)
+    return [
+        InterfaceNet(str(pid.id), "constant", subtype, default, "in") for pid in p.identifier_list
+    ]
+
+
+def interface_signal(p):
+    subtype = intern(str(p.subtype_indication))
+    default = nonestr(p.default)
+    mode = intern(str(p.mode))
+    return [
+        InterfaceNet(str(pid.id), "signal", subtype, default, mode) for pid in p.identifier_list
+    ]
+
+
+def interface_type(p):
+    return [InterfaceType(str(p.identifier))]
+
+
+def interface_subprogram(p):
+    return [
+        InterfaceSubprogram(
+            str(p.interface_subprogram_specification),
+            nonestr(p.interface_subprogram_default),
+        )
+    ]
+
+
+def interface_package(p):
+    return [InterfacePackage(str(p.identifier), str(p.uninstantiated_package_name))]
+
+
+# handlers for the declarations allowed in generic and port clauses, looked up by the exact CST type
+GENERIC_HANDLERS = {
+    VhdlCst.InterfaceConstantDeclaration: interface_constant,
+    VhdlCst.InterfaceIncompleteTypeDeclaration: interface_type,
+    VhdlCst.InterfaceSubprogramDeclaration: interface_subprogram,
+    VhdlCst.InterfacePackageDeclaration: interface_package,
+}
+PORT_HANDLERS = {
+    VhdlCst.InterfaceSignalDeclaration: interface_signal,
+}
+
+
+def interface_elements(clause, attr, handlers, kind):
+    elems = []
+    for elem in clause.interface_elements:
+        p = getattr(elem, attr)
+        handler = handlers.get(type(p))
+        if handler is None:
+            raise ValueError(f"bad {kind} type {type(p).__name__}")
+        elems.extend(handler(p))
+    return elems
+
+
 @dataclass
 class Subprogram(Tree):
     name: str
@@ -214,34 +297,9 @@ class DeclaredPackage(Tree):
 
     def add_package(self, pkg: VhdlCst.PackageDeclaration):
         if clause := pkg.package_header.generic_clause:
-            for param in clause.interface_elements:
-                p = param.generic_declaration
-                if isinstance(p, VhdlCst.InterfaceConstantDeclaration):
-                    for pid in p.identifier_list:
-                        self.parameters.append(
-                            InterfaceNet(
-                                str(pid.id),
-                                "constant",
-                                str(p.subtype_indication),
-                                nonestr(p.default),
-                                "in",
-                            )
-                        )
-                elif isinstance(p, VhdlCst.InterfaceIncompleteTypeDeclaration):
-                    self.parameters.append(InterfaceType(str(p.identifier)))
-                elif isinstance(p, VhdlCst.InterfaceSubprogramDeclaration):
-                    self.parameters.append(
-                        InterfaceSubprogram(
-                            str(p.interface_subprogram_specification),
-                            nonestr(p.interface_subprogram_default),
-                        )
-                    )
-                elif isinstance(p, VhdlCst.InterfacePackageDeclaration):
-                    self.parameters.append(
-                        InterfacePackage(str(p.identifier), str(p.uninstantiated_package_name))
-                    )
-                else:
-                    raise ValueError(f"bad package generic type {type(p).__name__}")
+            self.parameters.extend(
+                interface_elements(clause, "generic_declaration", GENERIC_HANDLERS, "package generic")
+            )
         for dec in pkg.package_declarative_part:
             dec = dec.item
             if isinstance(dec, VhdlCst.SubprogramDeclaration):
@@ -282,50 +340,13 @@ class Module(Tree):
 
     def add_entity(self, ent: VhdlCst.EntityDeclaration):
         if clause := ent.entity_header.generic_clause:
-            for param in clause.interface_elements:
-                p = param.generic_declaration
-                if isinstance(p, VhdlCst.InterfaceConstantDeclaration):
-                    for pid in p.identifier_list:
-                        self.parameters.append(
-                            InterfaceNet(
-                                str(pid.id),
-                                "constant",
-                                str(p.subtype_indication),
-                                nonestr(p.default),
-                                "in",
-                            )
-                        )
-                elif isinstance(p, VhdlCst.InterfaceIncompleteTypeDeclaration):
-                    self.parameters.append(InterfaceType(str(p.identifier)))
-                elif isinstance(p, VhdlCst.InterfaceSubprogramDeclaration):
-                    self.parameters.append(
-                        InterfaceSubprogram(
-                            str(p.interface_subprogram_specification),
-                            nonestr(p.interface_subprogram_default),
-                        )
-                    )
-                elif isinstance(p, VhdlCst.InterfacePackageDeclaration):
-                    self.parameters.append(
-                        InterfacePackage(str(p.identifier), str(p.uninstantiated_package_name))
-                    )
-                else:
-                    raise ValueError(f"bad entity generic type {type(p).__name__}")
+            self.parameters.extend(
+                interface_elements(clause, "generic_declaration", GENERIC_HANDLERS, "entity generic")
+            )
         if clause := ent.entity_header.port_clause:
-            for port in clause.interface_elements:
-                p = port.port_declaration
-                if isinstance(p, VhdlCst.InterfaceSignalDeclaration):
-                    for pid in p.identifier_list:
-                        self.ports.append(
-                            InterfaceNet(
-                                str(pid.id),
-                                "signal",
-                                str(p.subtype_indication),
-                                nonestr(p.default),
-                                str(p.mode),
-                            )
-                        )
-                else:
-                    raise ValueError(f"bad entity port type {type(p).__name__}")
+            self.ports.extend(
+                interface_elements(clause, "port_declaration", PORT_HANDLERS, "entity port")
+            )
 
     def add_arch(self, arch: VhdlCst.ArchitectureBody):
         self.arch_name = arch.identifier
@@ -344,16 +365,38 @@ class Library(Tree):
     name: str
     packages: List[Package] = field(default_factory=list)
     modules: List[Module] = field(default_factory=list)
+    # lookup tables keyed on the lowercased name, kept in sync with the lists above by add_cst
+    module_index: dict[str, Module] = field(
+        init=False, repr=False, compare=False, default_factory=dict, metadata={"index": True}
+    )
+    package_index: dict[str, Package] = field(
+        init=False, repr=False, compare=False, default_factory=dict, metadata={"index": True}
+    )
+    # every design unit in a file refers to the same File object
+    file_index: dict[Path, File] = field(
+        init=False, repr=False, compare=False, default_factory=dict, metadata={"index": True}
+    )
 
     def get_module(self, name):
-        for mod in self.modules:
-            if mod.name.lower() == name.lower():
-                return mod
+        return self.module_index.get(name.lower())
 
     def get_package(self, name):
-        for pkg in self.packages:
-            if pkg.name.lower() == name.lower():
-                return pkg
+        return self.package_index.get(name.lower())
+
+    # add to the list and the lookup table together. like the old linear scans, the first one added
+    # with a name is the one that gets found
+    def add_module(self, mod: Module):
+        self.modules.append(mod)
+        self.module_index.setdefault(mod.name.lower(), mod)
+
+    def add_package(self, pkg: Package):
+        self.packages.append(pkg)
+        self.package_index.setdefault(pkg.name.lower(), pkg)
+
+    def intern_file(self, path):
+        if (file := self.file_index.get(path)) is None:
+            file = self.file_index[path] = File(path)
+        return file
 
     def add_cst(self, cst):
         assert isinstance(cst, VhdlCst.DesignFile)
@@ -365,10 +408,10 @@ class Library(Tree):
                 name = str(lu.identifier)
                 if mod := self.get_module(name):
                     raise ValueError(f"entity {name} already exists")
-                mod = Module(name, {File(cst.path)})
+                mod = Module(name, {self.intern_file(cst.path)})
                 mod.add_context(ctx)
                 mod.add_entity(lu)
-                self.modules.append(mod)
+                self.add_module(mod)
                 new_mods.append(mod)
             elif isinstance(lu, VhdlCst.ArchitectureBody):
                 name = str(lu.entity_name)
@@ -385,10 +428,10 @@ class Library(Tree):
                 name = str(lu.identifier)
                 if pkg := self.get_package(name):
                     raise ValueError(f"package {name} already exists")
-                pkg = DeclaredPackage(name, {File(cst.path)})
+                pkg = DeclaredPackage(name, {self.intern_file(cst.path)})
                 pkg.add_context(ctx)
                 pkg.add_package(lu)
-                self.packages.append(pkg)
+                self.add_package(pkg)
                 new_mods.append(pkg)
             elif isinstance(lu, VhdlCst.PackageBody):
                 name = str(lu.simple_name)
@@ -397,7 +440,7 @@ class Library(Tree):
                         raise ValueError(f"package {name} already has a body")
                     pkg.add_context(ctx)
                     pkg.add_body(lu)
-                    pkg.files.add(File(cst.path))
+                    pkg.files.add(self.intern_file(cst.path))
                 else:
                     raise ValueError(f"package {name} doesn't exist")
             elif isinstance(lu, VhdlCst.PackageInstantiationDeclaration):
@@ -411,8 +454,8 @@ class Library(Tree):
                             formal = str(m.formal) if m.formal else idx
                             actual = str(m.actual)
                             mapping.append((formal, actual))
-                    newpkg = InstancedPackage(inst, {File(cst.path)}, pkg, mapping)
-                    self.packages.append(newpkg)
+                    newpkg = InstancedPackage(inst, {self.intern_file(cst.path)}, pkg, mapping)
+                    self.add_package(newpkg)
                     new_mods.append(newpkg)
                 else:
                     raise ValueError(f"package {pkgname} doesn't exist")
@@ -427,25 +470,41 @@ class Project(Tree):
     use_regex: InitVar[bool] = True
     debug_lark: InitVar[bool] = False
     add_std: InitVar[bool] = False
+    cache: InitVar[bool] = False
+    # worker processes for parsing the standard libraries, None for one per CPU
+    workers: InitVar[int | None] = 1
     libraries: List[Library] = field(init=False, default_factory=list)
     parser: HdlParser = field(init=False)
-
-    def __post_init__(self, ambig: bool, use_regex: bool, debug_lark: bool, add_std: bool):
-        self.parser = HdlParser(ambig, use_regex, debug_lark)
+    library_index: dict[str, Library] = field(
+        init=False, repr=False, compare=False, default_factory=dict, metadata={"index": True}
+    )
+
+    def __post_init__(
+        self,
+        ambig: bool,
+        use_regex: bool,
+        debug_lark: bool,
+        add_std: bool,
+        cache: bool,
+        workers: int | None,
+    ):
+        self.parser = HdlParser(ambig, use_regex, debug_lark, cache)
 
         if add_std:
-            self.add_library("std")
-            cwd = Path(__file__).parent / "std"
-            # for f in ["env.vhdl", "standard.vhdl", "textio.vhdl"]:
-            for f in cwd.glob("*.vhdl"):
-                if "-body" not in f.name:
-                    self.add_file("std", f.as_posix())
-
-            self.add_library("ieee")
-            cwd = Path(__file__).parent / "ieee2008"
-            for f in cwd.glob("*.vhdl"):
-                if "-body" not in f.name:
-                    self.add_file("ieee", f.as_posix())
+            jobs = []
+            for libname, dirname in [("std", "std"), ("ieee", "ieee2008")]:
+                lib = self.add_library(libname)
+                cwd = Path(__file__).parent / dirname
+                # for f in ["env.vhdl", "standard.vhdl", "textio.vhdl"]:
+                for f in sorted(cwd.glob("*.vhdl")):
+                    if not f.stem.endswith("-body"):
+                        jobs.append((lib, f.as_posix()))
+
+            # the files are independent so they can be parsed in parallel, but add them in order
+            # since packages can depend on packages added before them
+            csts = self.parser.parse_files([f for _, f in jobs], workers)
+            for (lib, _), cst in zip(jobs, csts):
+                lib.add_cst(cst)
 
     def add_file(
         self, lib: Library | str, file: TextIOBase | Path | str, print_cst=False, debug=False
@@ -474,36 +533,36 @@ class Project(Tree):
             self.get_library(lib).add_cst(cst)
 
         if debug:
-            lines = file.read_text("latin-1").count("\n")
+            lines = cst.line_count
             elapsed = time() - prev
             print(
                 f"\ranalyzed {file} ({lines} lines) in {elapsed:.2f} seconds ({lines/elapsed if elapsed else float('inf'):.2f} lines/sec)"
             )
 
         if print_cst:
-            con = Console(emoji=False)
-            con.print(cst.rich_tree())
+            cst.render_to(Console(emoji=False))
 
         return cst
 
     def add_library(self, name: str) -> Library:
-        for lib in self.libraries:
-            if lib.name.lower() == name.lower():
-                raise ValueError(f"library named {name} already exists")
+        if name.lower() in self.library_index:
+            raise ValueError(f"library named {name} already exists")
         self.libraries.append(Library(name))
+        self.library_index[name.lower()] = self.libraries[-1]
         return self.libraries[-1]
 
     def get_library(self, name: str) -> Library:
-        for lib in self.libraries:
-            if lib.name.lower() == name.lower():
-                return lib
+        if lib := self.library_index.get(name.lower()):
+            return lib
         raise ValueError(f"no library named {name}")
 
     def print_simple(self):
+        # collect the lines and write them out at once, a print per line is slow for big projects
+        buf = []
         for lib in self.libraries:
             if lib.name in ["std", "ieee"]:
                 continue
-            print(f"library {lib.name}")
+            buf.append(f"library {lib.name}")
             for pkg in lib.packages:
                 inst = None
                 mapping = []
@@ -511,11 +570,11 @@ class Project(Tree):
                     inst = pkg
                     mapping = pkg.mapping
                     pkg = pkg.declaration
-                print(
+                buf.append(
                     f"\tpackage {(inst.name + ' is ') if inst else ''}{pkg.name} -> {[f.path.as_posix() for f in ((inst.files if inst else set()) | pkg.files)]}"
                 )
                 if params := pkg.parameters:
-                    print(f"\t\tgeneric")
+                    buf.append(f"\t\tgeneric")
                     for idx, p in enumerate(params):
                         try:
                             default = p.default
@@ -526,52 +585,56 @@ class Project(Tree):
                                 default = a
                                 break
                         if isinstance(p, InterfaceNet):
-                            print(
+                            buf.append(
                                 f"\t\t\t{p.name} : {p.type}{(' := ' + default) if default else ''}"
                             )
                         elif isinstance(p, InterfaceType):
-                            print(f"\t\t\ttype {p.name}{(' := ' + default) if default else ''}")
+                            buf.append(
+                                f"\t\t\ttype {p.name}{(' := ' + default) if default else ''}"
+                            )
                         elif isinstance(p, InterfaceSubprogram):
-                            print(
+                            buf.append(
                                 f"\t\t\tsubprogram {p.name}{(' := ' + default) if default else ''}"
                             )
                         elif isinstance(p, InterfacePackage):
-                            print(
+                            buf.append(
                                 f"\t\t\tpackage {p.name} is {p.base_name}{(' := ' + default) if default else ''}"
                             )
                         else:
                             raise ValueError(f"bad package generic type {type(p).__name__}")
                 if subprograms := pkg.subprograms:
-                    print(f"\t\tsubprogram")
+                    buf.append(f"\t\tsubprogram")
                     for s in subprograms:
                         if isinstance(s, Subprogram):
-                            print(f"\t\t\t{s.name}")
+                            buf.append(f"\t\t\t{s.name}")
                         else:
                             raise ValueError(f"bad package subprogram type {type(s).__name__}")
             for mod in lib.modules:
-                print(
+                buf.append(
                     f"\tmodule {mod.name}({mod.arch_name}) -> {[f.path.as_posix() for f in mod.files]}"
                 )
                 if params := mod.parameters:
-                    print(f"\t\tgeneric")
+                    buf.append(f"\t\tgeneric")
                     for p in params:
                         if isinstance(p, InterfaceNet):
-                            print(
+                            buf.append(
                                 f"\t\t\t{p.name} : {p.type} {(':= ' + p.default) if p.default is not None else ''}"
                             )
                         elif isinstance(p, InterfaceType):
-                            print(f"\t\t\ttype {p.name}")
+                            buf.append(f"\t\t\ttype {p.name}")
                         elif isinstance(p, InterfaceSubprogram):
-                            print(
+                            buf.append(
                                 f"\t\t\t{p.name} : subprogram {(':= ' + p.default) if p.default is not None else ''}"
                             )
                         elif isinstance(p, InterfacePackage):
-                            print(f"\t\t\t{p.name} : package := {p.base_name}")
+                            buf.append(f"\t\t\t{p.name} : package := {p.base_name}")
                         else:
                             raise ValueError(f"bad module generic type {type(p).__name__}")
                 if ports := mod.ports:
-                    print(f"\t\tport")
+                    buf.append(f"\t\tport")
                     for p in ports:
-                        print(
+                        buf.append(
                             f"\t\t\t{p.name} : {p.dir} {p.type} {(':= ' + p.default) if p.default is not None else ''}"
                         )
+        if buf:
+            sys.stdout.write("\n".join(buf) + "\n")
@@ -1,13 +1,33 @@
 import logging
+import pickle
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from hashlib import blake2b
 from io import TextIOBase
+from mmap import mmap, ACCESS_READ
+from multiprocessing import get_context
+from os import cpu_count, fstat, getpid, path, replace, sep, walk
 from pathlib import Path
+from sys import platform
 from lark import Lark, logger, ast_utils
+from lark.exceptions import UnexpectedInput, VisitError
 from lark_ambig_tools import CountTrees
 from typing import List
+from json import dumps, loads
 
 from . import VhdlParseTreeTransformers
 from . import VhdlCstTransformer
 
+try:
+    import regex
+
+    HAS_REGEX = True
+except ModuleNotFoundError:
+    HAS_REGEX = False
+
+
+CACHE_DIR = Path.home() / ".cache" / "hdltree"
 
 vhdl_fileext = ["vhd", "vhdl", "vht"]
 vlog_fileext = ["v", "vh", "verilog", "vlg", "vo", "vqm", "vt", "veo", "sv", "svh", "vlog"]
@@ -24,21 +44,35 @@ def filetype(fpath: Path):
 
 
 def collect_files(include: List[Path], exclude: List[Path]):
+    # absolute excluded paths ending in a separator, with any that are inside another one dropped.
+    # then the only one that can contain a path is the last one sorting before it
+    prefixes = []
+    for ex in sorted(path.abspath(ex) + sep for ex in exclude):
+        if not prefixes or not ex.startswith(prefixes[-1]):
+            prefixes.append(ex)
+
     def is_excluded(test: Path):
-        for ex in exclude:
-            if inpath.is_relative_to(ex):
-                return True
-        return False
+        test = path.abspath(test) + sep
+        i = bisect_right(prefixes, test) - 1
+        return i >= 0 and test.startswith(prefixes[i])
 
     files = []
     for inpath in include:
         if inpath.is_file() and not is_excluded(inpath):
             files.append(inpath)
         elif inpath.is_dir() and not is_excluded(inpath):
-            for ext in vhdl_fileext:
-                for infile in inpath.rglob("*." + ext):
-                    if infile.is_file() and not is_excluded(infile):
-                        files.append(infile)
+            # walk the tree once, skipping excluded subtrees, and keep the files grouped by extension
+            found = {"." + ext: [] for ext in vhdl_fileext}
+            for root, dirs, fnames in walk(inpath):
+                dirs[:] = [d for d in dirs if not is_excluded(path.join(root, d))]
+                for fn in fnames:
+                    matches = found.get(path.splitext(fn)[1])
+                    if matches is not None:
+                        infile = Path(root, fn)
+                        if not is_excluded(infile):
+                            matches.append(infile)
+            for matches in found.values():
+                files.extend(matches)
     return files
 
 
@@ -50,32 +84,98 @@ def count(tree):
     print(f"derivations: {counted_tree.derivation_count}")
 
 
-class HdlParser:
-    def __init__(self, ambig=False, use_regex=True, debug=False):
-        if debug:
-            logger.setLevel(logging.DEBUG)
-
-        if use_regex:
-            try:
-                import regex
-            except ModuleNotFoundError:
-                logger.warning("regex lib requested but not available")
-                use_regex = False
+# only warn the first time a parser asks for the missing regex lib
+@lru_cache(maxsize=None)
+def warn_no_regex():
+    logger.warning("regex lib requested but not available")
 
-        self.ambig = ambig
 
-        self.vhdl_parser = Lark(
-            open(Path(__file__).parent / "vhdl-2008.lark", encoding="latin-1"),
+# compiling the grammar is slow and only depends on these options, so share parsers between HdlParser instances
+@lru_cache(maxsize=4)
+def get_vhdl_parser(use_regex=False, debug=False, ambiguity="resolve", propagate_positions=False):
+    with open(Path(__file__).parent / "vhdl-2008.lark", encoding="latin-1") as grammar:
+        return Lark(
+            grammar,
             start="design_file",
             regex=use_regex,
             debug=debug,
-            ambiguity="explicit",
+            ambiguity=ambiguity,
             lexer="dynamic",
-            propagate_positions=True,
+            propagate_positions=propagate_positions,
         )
-        self.vhdl_transformer = ast_utils.create_transformer(
-            VhdlCstTransformer, VhdlParseTreeTransformers.Tokens()
+
+
+# the transformer holds no state between transforms, so one instance can be shared as well
+@lru_cache(maxsize=None)
+def get_vhdl_transformer():
+    return ast_utils.create_transformer(VhdlCstTransformer, VhdlParseTreeTransformers.Tokens())
+
+
+# the CST of a file depends on the grammar and on the code that converts the parse tree, so cached
+# results are only valid for the same versions of all three
+@lru_cache(maxsize=None)
+def cst_version():
+    h = blake2b(digest_size=8)
+    for name in ["vhdl-2008.lark", "VhdlParseTreeTransformers.py", "VhdlCstTransformer.py"]:
+        h.update((Path(__file__).parent / name).read_bytes())
+    return h.hexdigest()
+
+
+# key for the parse cache. files are decoded as latin-1, so hashing text that encodes back to latin-1
+# gives the same key as hashing the bytes of the file. other text is hashed as utf-8 in its own domain
+def source_digest(data: bytes | str):
+    person = b""
+    if isinstance(data, str):
+        try:
+            data = data.encode("latin-1")
+        except UnicodeEncodeError:
+            data = data.encode("utf-8", "surrogatepass")
+            person = b"utf-8"
+    return blake2b(data, digest_size=16, person=person).hexdigest()
+
+
+# read a file as latin-1 text, and its cache key if asked for. the file is mapped instead of read so
+# the text is decoded straight from the page cache without a copy of the bytes in between
+def read_source(fpath: Path, digest=False):
+    with open(fpath, "rb") as f:
+        # empty files can't be mapped
+        if fstat(f.fileno()).st_size == 0:
+            return "", source_digest(b"") if digest else None
+        with mmap(f.fileno(), 0, access=ACCESS_READ) as data:
+            txt = str(data, "latin-1")
+            key = source_digest(data) if digest else None
+    # same newline handling as reading the file in text mode
+    if "\r" in txt:
+        txt = txt.replace("\r\n", "\n").replace("\r", "\n")
+    return txt, key
+
+
+class HdlParser:
+    def __init__(self, ambig=False, use_regex=True, debug=False, cache=False):
+        if debug:
+            logger.setLevel(logging.DEBUG)
+
+        if use_regex and not HAS_REGEX:
+            warn_no_regex()
+            use_regex = False
+
+        self.ambig = ambig
+        self.use_regex = use_regex
+        self.debug = debug
+        # reuse CSTs of previously parsed text from CACHE_DIR
+        self.cache = cache
+
+        # the grammar needs Earley with the dynamic lexer, the basic lexer can't tell apart terminals
+        # that overlap (it fails on the first comment) and the contextual lexer is LALR only.
+        # LALR itself is out, VHDL names can't be told apart without context (a name followed by a
+        # paren may be a function, type, subtype or prefix) which gives hundreds of reduce/reduce
+        # collisions, so there's no table to build and no LALR pass to try before falling back.
+        # ambiguities are kept explicit so MakeAmbigUnique can resolve them with semantic rules.
+        # propagate_positions is kept on, it doesn't measurably change parse time
+        self.vhdl_parser = get_vhdl_parser(
+            use_regex=use_regex, debug=debug, ambiguity="explicit", propagate_positions=True
         )
+        self.vhdl_transformer = get_vhdl_transformer()
 
         self.vlog_parser = None
 
@@ -90,23 +190,65 @@ class HdlParser:
         assert ftype in ["VHDL", "VLOG"]
 
         if isinstance(fpath, Path):
-            txt = fpath.read_text("latin-1")
-            p = self.parse(txt, ftype)
+            txt, digest = read_source(fpath, self.cache)
+            p = self.parse(txt, ftype, digest)
         elif isinstance(fpath, TextIOBase):
             txt = fpath.read()
             p = self.parse(txt, ftype)
         p.path = fpath
+        # for reporting, so callers don't have to read the file again
+        p.line_count = txt.count("\n")
         return p
 
-    def parse(self, txt: str, ftype: str):
+    def parse_files(self, fpaths: List[Path | str], workers: int | None = None):
+        """Parse files in a pool of worker processes, yielding the CSTs in the same order as fpaths.
+
+        Outside of Linux the workers are spawned and re-import the calling script, so scripts
+        that call this with more than one worker need an ``if __name__ == "__main__":`` guard.
+        """
+        fpaths = list(fpaths)
+        workers = workers or min(len(fpaths), cpu_count() or 1)
+        # a pool isn't worth starting for a single worker, and would pickle every CST back for nothing
+        if workers <= 1 or len(fpaths) <= 1:
+            for fpath in fpaths:
+                try:
+                    cst = self.parse_file(fpath)
+                except (UnexpectedInput, VisitError) as e:
+                    raise ParseFileError.from_lark(fpath, e) from None
+                yield cst
+            return
+        # forked workers inherit the grammar that was already compiled for this parser. fork is only
+        # used on Linux, elsewhere forking a process that may have started threads isn't safe
+        ctx = get_context("fork" if platform == "linux" else None)
+        parse = partial(
+            parse_in_worker,
+            ambig=self.ambig,
+            use_regex=self.use_regex,
+            debug=self.debug,
+            cache=self.cache,
+        )
+        with ProcessPoolExecutor(workers, mp_context=ctx) as pool:
+            yield from pool.map(parse, fpaths)
+
+    def parse(self, txt: str, ftype: str, digest: str | None = None):
         if ftype == "VHDL":
-            return self.parse_vhdl(txt)
+            return self.parse_vhdl(txt, digest)
         elif ftype == "VLOG":
             return self.parse_vlog(txt)
         else:
             raise ValueError(f"unknown file type {ftype}")
 
-    def parse_vhdl(self, txt: str):
+    def parse_vhdl(self, txt: str, digest: str | None = None):
+        # the ambiguity report is printed while parsing, so always parse in that case
+        if self.cache and not self.ambig:
+            digest = digest or source_digest(txt)
+            cache_file = CACHE_DIR / f"{digest}-{cst_version()}.pkl"
+            try:
+                return pickle.loads(cache_file.read_bytes())
+            except Exception:
+                # missing or unreadable entry, parse it again
+                pass
+
         # parse code to tree
         parse_tree = self.vhdl_parser.parse(txt)
 
@@ -114,11 +256,9 @@ class HdlParser:
         if self.ambig:
             from colorama import Fore
 
-            parser2 = Lark(
-                open("hdltree/vhdl-2008.lark", encoding="latin-1"),
-                start="design_file",
-            )
-            parse_tree2 = parser2.parse(txt)
+            # collapsing the raw explicit tree picks the same derivations as lark's
+            # own resolution, so the reference tree doesn't need a second parse
+            parse_tree2 = VhdlParseTreeTransformers.CollapseAmbig().transform(parse_tree)
             count(parse_tree)
             parse_tree = VhdlParseTreeTransformers.MakeAmbigUnique().transform(parse_tree)
             count(parse_tree)
@@ -131,8 +271,7 @@ class HdlParser:
                 + Fore.RESET
             )
         else:
-            parse_tree = VhdlParseTreeTransformers.MakeAmbigUnique().transform(parse_tree)
-            parse_tree = VhdlParseTreeTransformers.CollapseAmbig().transform(parse_tree)
+            parse_tree = VhdlParseTreeTransformers.MakeAmbigUniqueAndCollapse().transform(parse_tree)
 
         # convert parse tree to custom format
         # try:
@@ -143,7 +282,67 @@ class HdlParser:
         #    print(e.__context__)
         #    errjson = e.__context__.json()
         #    print(dumps(loads(errjson), indent=2))
+
+        if self.cache and not self.ambig:
+            try:
+                CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                # write to a temporary file first so other processes never see a partial entry
+                tmp_file = cache_file.with_suffix(f".{getpid()}.tmp")
+                tmp_file.write_bytes(pickle.dumps(cst, protocol=pickle.HIGHEST_PROTOCOL))
+                replace(tmp_file, cache_file)
+            except (OSError, RecursionError, pickle.PicklingError):
+                logger.warning(f"couldn't write parse cache entry {cache_file}")
         return cst
 
     def parse_vlog(self, txt: str):
         raise NotImplementedError("Verilog parsing not yet supported!")
+
+
+# parse failure of a single file. lark's exceptions can't be unpickled after being raised in a
+# worker process, so their details are copied into plain values that can
+class ParseFileError(Exception):
+    def __init__(self, path, line=None, column=None, allowed=None, considered_rules=None, detail=None):
+        super().__init__(path, line, column, allowed, considered_rules, detail)
+        self.path = path
+        self.line = line
+        self.column = column
+        self.allowed = allowed
+        self.considered_rules = considered_rules
+        self.detail = detail
+
+    @classmethod
+    def from_lark(cls, path, e: UnexpectedInput | VisitError):
+        if isinstance(e, VisitError):
+            detail = str(e)
+            if hasattr(e.orig_exc, "json"):
+                detail += "\n" + dumps(loads(e.orig_exc.json()), indent=2)
+            return cls(str(path), detail=detail)
+        considered = getattr(e, "considered_rules", None)
+        return cls(
+            str(path),
+            e.line,
+            e.column,
+            getattr(e, "allowed", None) or getattr(e, "expected", None),
+            considered and {str(r) for r in considered},
+        )
+
+    def __str__(self):
+        if self.detail is not None:
+            return f"error in {self.path}\n{self.detail}"
+        return (
+            f"error in {self.path} at line {self.line}, column {self.column}\n"
+            f"expected:\n{self.allowed}\nfrom rules:\n{self.considered_rules}"
+        )
+
+
+# each worker process builds its own parser once and reuses it for every file it gets
+@lru_cache(maxsize=None)
+def worker_parser(ambig, use_regex, debug, cache):
+    return HdlParser(ambig, use_regex, debug, cache)
+
+
+def parse_in_worker(fpath, ambig, use_regex, debug, cache):
+    try:
+        return worker_parser(ambig, use_regex, debug, cache).parse_file(fpath)
+    except (UnexpectedInput, VisitError) as e:
+        raise ParseFileError.from_lark(fpath, e) from None
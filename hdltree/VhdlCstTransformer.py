@@ -1,6 +1,5 @@
 from __future__ import annotations  # for forward annotations
 
-from sys import modules
 from os import getenv
 from types import SimpleNamespace
 from typing import List, TypeAlias, Optional
@@ -8,10 +7,15 @@ from pathlib import Path
 from lark import ast_utils, Token
 from lark.tree import Meta
 from dataclasses import fields
-from re import sub
+from functools import lru_cache
+from operator import attrgetter
+from rich.markup import escape
+from rich.tree import Tree as RichTree
 
-if getenv("DEBUG"):
-    # check datatypes with pydantic, somewhat slower
+from hdltree.treeutils import annotate_type, camel2snake, deref_type, list_item_type
+
+if getenv("HDLTREE_VALIDATE") == "1":
+    # check datatypes with pydantic, much slower since every field of every node is validated
     from pydantic import ConfigDict
     from pydantic.dataclasses import dataclass
 
@@ -27,19 +31,65 @@ nl = "\n"
 # join with `sep` if it's an array
 # prepend `pre` and postpend `post` iff the object resolves to a nonempty string
 def nonestr(val, pre="", post="", sep=""):
+    # most optional parts are absent or empty lists, so don't format anything for them
+    if not val:
+        return ""
     if isinstance(val, list):
         assert sep != ""
         valstr = sep.join(map(str, val))
     else:
         valstr = str(val)
-    if val is not None and valstr != "":
-        return str(pre) + valstr + str(post)
+    if valstr:
+        return pre + valstr + post
     else:
         return ""
 
 
-def camel2snake(name):
-    return sub(r"([a-z])([A-Z])", r"\1_\2", name).lower()
+# step through a flat list of alternating parts n at a time without slicing copies of it
+def groups(val, n=2):
+    it = iter(val)
+    return zip(*[it] * n)
+
+
+# the name and fields of a class never change, so only look them up once per class.
+# the meta field holds lark's position info and isn't part of the tree
+@lru_cache(maxsize=None)
+def node_info(cls):
+    return camel2snake(cls.__name__), tuple(f for f in fields(cls) if f.name != "meta")
+
+
+# getter for the values of all fields of a class that can hold child nodes, as a tuple
+@lru_cache(maxsize=None)
+def child_fields(cls):
+    names = tuple(f.name for f in node_info(cls)[1])
+    # attrgetter only returns a tuple for more than one name
+    if len(names) > 1:
+        return attrgetter(*names)
+    return lambda node: tuple(getattr(node, name) for name in names)
+
+
+# children of a rich.tree.Tree that are only built when rich renders their parent, and dropped again once
+# rich has iterated over them, so the whole rich tree of a big CST never has to exist at once
+class LazyChildren(list):
+    def __init__(self, build):
+        super().__init__()
+        self.build = build
+        self.built = False
+
+    def materialize(self):
+        if not self.built:
+            self.extend(self.build())
+            self.built = True
+
+    def __len__(self):
+        self.materialize()
+        return super().__len__()
+
+    def __iter__(self):
+        self.materialize()
+        yield from super().__iter__()
+        self.clear()
+        self.built = False
 
 
 # Base class for CST nodes to get picked up by lark
@@ -52,7 +102,7 @@ class _VhdlCstNode(ast_utils.Ast, ast_utils.WithMeta):
         return self.format()
 
     def add_parent(self, parent):
-        super().__setattr__("parent", parent)
+        self.parent = parent
 
     # a few Tree functions borrowed from Lark so _VhdlCstNode is sort of but not exactly like a lark Tree
     # (subclassing messes with dataclass fields when using WithMeta)
@@ -77,26 +127,46 @@ class _VhdlCstNode(ast_utils.Ast, ast_utils.WithMeta):
 
     def find_data(self, data):
         """Returns all nodes of the tree whose data equals the given data."""
-        return self.find_pred(lambda t: t.data == data)
-
-    @property
-    def data(self):
-        return type(self).__name__
+        # same order as filtering iter_subtrees, but reads the fields directly instead of building children
+        # lists, and skips the visited set since the CST is a real tree (AddCstParent checks every node gets
+        # a single parent)
+        found = []
+        queue = [self]
+        append = queue.append
+        for subtree in queue:
+            if subtree.data == data:
+                found.append(subtree)
+            for field_val in reversed(child_fields(type(subtree))(subtree)):
+                if type(field_val) is list:
+                    for c in reversed(field_val):
+                        if isinstance(c, ast_utils.Ast):
+                            append(c)
+                elif isinstance(field_val, ast_utils.Ast):
+                    append(field_val)
+        found.reverse()
+        return found
+
+    # like the rule name of a lark Tree, a plain class attribute so reading it is just a lookup
+    # (no super() call, slots=True replaces this class so its __class__ cell is stale)
+    def __init_subclass__(cls):
+        cls.data = cls.__name__
 
     @property
     def children(self):
-        fs = fields(self)
+        fs = node_info(type(self))[1]
         fv0 = getattr(self, fs[0].name)
         if len(fs) == 1 and isinstance(fv0, list):
             return fv0
         else:
             children = []
-            for field_meta in fields(self):
+            extend = children.extend
+            append = children.append
+            for field_meta in fs:
                 field_val = getattr(self, field_meta.name)
-                if isinstance(field_val, list):
-                    children += field_val
-                elif not isinstance(field_val, Meta):
-                    children.append(field_val)
+                if type(field_val) is list:
+                    extend(field_val)
+                else:
+                    append(field_val)
                 # if not isinstance(field_val, list) and field_val is not None:
                 #  children.append(field_val)
                 # elif field_val is not None:
@@ -144,11 +214,10 @@ class _VhdlCstNode(ast_utils.Ast, ast_utils.WithMeta):
         def indent(num):
             return INDENT_TOKEN * num
 
-        print(indent(level) + camel2snake(type(self).__name__))
-        for f in fields(self):
+        snake, fs = node_info(type(self))
+        print(indent(level) + snake)
+        for f in fs:
             fobj = getattr(self, f.name)
-            if isinstance(fobj, Meta):
-                continue
             if not isinstance(fobj, list):
                 fobj = [fobj]
             else:
@@ -162,59 +231,27 @@ class _VhdlCstNode(ast_utils.Ast, ast_utils.WithMeta):
                     print(indent(level) + str(obj))
 
     # return a rich.tree.Tree for pretty printing
-    def rich_tree(self, self_meta=None):
-        from rich.tree import Tree as RichTree
-        from rich.markup import escape
-
-        # expand aliases
-        def deref_type(rawtype):
-            newtype = []
-            for rt in rawtype.split(" | "):
-                try:
-                    # get a reference to the containing module
-                    thismodule = modules[self.__module__]  # __import__(__name__)
-                    # try to get the attribute, errors out here if it doesn't exist
-                    aliastype = getattr(thismodule, rt)
-                    # make sure it's an alias
-                    if not isinstance(aliastype, type):  # get_origin(uniontype):
-                        # chop off the module name and prepend the alias name
-                        nopre = sub(r"typing\.", "", str(aliastype))
-                        nopre = sub(f"{__name__}\\.", "", nopre)
-                        newtype.append(f"{{ {rt} = " + nopre + " }")
-                    else:
-                        newtype.append(rt)
-                except:
-                    newtype.append(rt)
-            return " | ".join(newtype)
-
-        # take the full type hint of the field and underline the actual type of the object in the field
-        def annotate_type(field_type, obj):
-            # remove Optional wrapper used for rules with multiple branches with different numbers of subrules/tokens and not using a Union alias
-            noopt = sub(r"Optional\[(.*)\]", r"\1", field_type)
-            # set search pattern
-            if obj is None:
-                pat = r"\b(None)\b"
-            elif isinstance(obj, list):
-                pat = r"(List\[.*\])"
-            else:
-                pat = r"\b(" + type(obj).__name__ + r")\b"
-            return sub(pat, r"[underline]\1[/underline]", noopt)
-
+    def rich_tree(self, self_meta=None, lazy=False):
         # recursively convert a CST node into a rich.tree.Tree
         def field2tree(field_meta, field_val):
             if isinstance(field_val, _VhdlCstNode):
-                return [field_val.rich_tree(field_meta)]
+                return [field_val.rich_tree(field_meta, lazy)]
             elif isinstance(field_val, list):
-                annotated_type = annotate_type(deref_type(field_meta.type), field_val)
+                annotated_type = annotate_type(deref_type(field_meta.type, __name__), field_val)
                 list_branch = RichTree(
                     f"[blue] {field_meta.name}[{len(field_val)} items] [ {annotated_type} ]"
                 )
-                for ii, list_item in enumerate(field_val):
-                    list_type = sub(r"{ .* = (.*) }", r"\1", deref_type(field_meta.type))
-                    list_type = sub(r"List\[(.*)\]", r"\1", list_type)
-                    list_meta = SimpleNamespace(name=f"{field_meta.name}[{ii}]", type=list_type)
-                    for c in field2tree(list_meta, list_item):
-                        list_branch.children.append(c)
+
+                list_type = list_item_type(field_meta.type, __name__)
+
+                def list_children():
+                    children = []
+                    for ii, list_item in enumerate(field_val):
+                        list_meta = SimpleNamespace(name=f"{field_meta.name}[{ii}]", type=list_type)
+                        children.extend(field2tree(list_meta, list_item))
+                    return children
+
+                list_branch.children = LazyChildren(list_children) if lazy else list_children()
                 return [list_branch]
             elif isinstance(field_val, Token) or field_val is None:
                 annotated_type = annotate_type(field_meta.type, field_val)
@@ -232,27 +269,36 @@ class _VhdlCstNode(ast_utils.Ast, ast_utils.WithMeta):
             else:
                 raise ValueError(f"unknown CST item: {escape(str(field_val))}\nof type {type(field_val)}\nin Tree {field_val.parent}")
 
+        cls = type(self)
+        snake, fs = node_info(cls)
         if self_meta is None:
-            annotated_type = annotate_type(type(self).__name__, self)
-            branch = RichTree(f"{camel2snake(type(self).__name__)} [ {annotated_type} ]" + (f" line {self.meta.line} char {self.meta.column}" if not self.meta.empty else ""))
+            annotated_type = annotate_type(cls.__name__, self)
+            branch = RichTree(f"{snake} [ {annotated_type} ]" + (f" line {self.meta.line} char {self.meta.column}" if not self.meta.empty else ""))
         else:
             annotated_type = annotate_type(self_meta.type, self)
             branch = RichTree(self_meta.name + f" [ {annotated_type} ]" + (f" line {self.meta.line} char {self.meta.column}" if not self.meta.empty else ""))
-        for field_meta in fields(self):
-            field_val = getattr(self, field_meta.name)
-            if isinstance(field_val, Meta):
-                pass
-            else:
-                child = field2tree(field_meta, field_val)
-                for c in child:
-                    branch.children.append(c)
+
+        def field_children():
+            children = []
+            for field_meta in fs:
+                children.extend(field2tree(field_meta, getattr(self, field_meta.name)))
+            return children
+
+        branch.children = LazyChildren(field_children) if lazy else field_children()
         return branch
 
+    # print the rich tree of this node to a rich.console.Console, only building each part of it as it gets rendered
+    def render_to(self, console):
+        console.print(self.rich_tree(lazy=True))
+
 
 # subclass of _VhdlCstNode that takes a single argument that's a list of subTrees/Tokens
 @dataclass
 class _VhdlCstListNode(_VhdlCstNode, ast_utils.AsList):
-    pass
+    # these always hold exactly one list field, so skip the generic checks
+    @property
+    def children(self):
+        return getattr(self, node_info(type(self))[1][0].name)
 
 
 @dataclass
@@ -316,14 +362,7 @@ class BasedLiteral(_VhdlCstNode):
     exponent: Exponent | None
 
     def format(self):
-        return (
-            str(self.base)
-            + "#"
-            + str(self.integer)
-            + nonestr(self.decimal, pre=".")
-            + "#"
-            + nonestr(self.exponent)
-        )
+        return f"{self.base}#{self.integer}{nonestr(self.decimal, pre='.')}#{nonestr(self.exponent)}"
 
 
 @dataclass
@@ -382,7 +421,7 @@ class QualifiedExpression(_VhdlCstNode):
     expression: Expression | Aggregate
 
     def format(self):
-        if isinstance(self.expression, Expression):
+        if type(self.expression) in EXPRESSION_TYPES:
             return f"{self.type_mark}'({self.expression})"
         else:
             return f"{self.type_mark}'{self.expression}"
@@ -401,7 +440,7 @@ class Primary(_VhdlCstNode):
     item: Name | Literal | Aggregate | FunctionCall | QualifiedExpression | Allocator | Expression
 
     def format(self):
-        if isinstance(self.item, Expression):
+        if type(self.item) in EXPRESSION_TYPES:
             return "(" + str(self.item) + ")"
         else:
             return str(self.item)
@@ -428,38 +467,22 @@ class FactorOp(_VhdlCstNode):
 Factor: TypeAlias = FactorExp | FactorOp
 
 
-@dataclass
-class TermOp(_VhdlCstNode):
-    op: Token
-    factor: Factor
-
-    def format(self):
-        return f"{self.op} {self.factor}"
-
-
+# the operators and operands after the first one are kept in one flat list, like LogicalExpression,
+# instead of a node for each operator and operand pair
 @dataclass
 class Term(_VhdlCstNode):
     factor: Factor
-    ops: List[TermOp]
+    ops: List[Token | Factor]
 
     def format(self):
         return str(self.factor) + nonestr(self.ops, sep=" ", pre=" ")
 
 
-@dataclass
-class SimpleExpressionOp(_VhdlCstNode):
-    op: Token
-    term: Term
-
-    def format(self):
-        return f"{self.op} {self.term}"
-
-
 @dataclass
 class SimpleExpression(_VhdlCstNode):
     sign: Token | None
     term: Term
-    ops: List[SimpleExpressionOp]
+    ops: List[Token | Term]
 
     def format(self):
         return nonestr(self.sign) + f"{self.term}" + nonestr(self.ops, sep=" ", pre=" ")
@@ -511,6 +534,8 @@ class BareExpression(_VhdlCstNode):
 
 
 Expression: TypeAlias = ConditionalOperatorExpression | BareExpression
+# isinstance against a union is slower than a set lookup on the exact type, and neither class has subclasses
+EXPRESSION_TYPES = frozenset({ConditionalOperatorExpression, BareExpression})
 
 
 @dataclass
@@ -765,7 +790,7 @@ class Name(_VhdlCstNode):
     )
 
     def format(self):
-        return f"{self.name_val}"
+        return str(self.name_val)
 
 
 @dataclass
@@ -773,7 +798,7 @@ class Prefix(_VhdlCstNode):
     name: Name
 
     def format(self):
-        return f"{self.name}"
+        return str(self.name)
 
 
 @dataclass
@@ -781,7 +806,7 @@ class Suffix(_VhdlCstNode):
     name: Identifier | Token
 
     def format(self):
-        return f"{self.name}"
+        return str(self.name)
 
 
 @dataclass
@@ -831,7 +856,7 @@ class ResolutionIndication(_VhdlCstNode):
     item: Name | ElementResolution
 
     def format(self):
-        if isinstance(self.item, Name):
+        if type(self.item) is Name:
             return str(self.item)
         else:
             return f"({str(self.item)})"
@@ -858,12 +883,8 @@ class InterfaceSignalDeclaration(_VhdlCstNode):
 
     def format(self):
         return (
-            nonestr(self.SIGNAL, post=" ")
-            + nonestr(self.identifier_list, sep=", ")
-            + " : "
-            + nonestr(self.mode, post=" ")
-            + str(self.subtype_indication)
-            + nonestr(self.default, pre=" := ")
+            f"{nonestr(self.SIGNAL, post=' ')}{nonestr(self.identifier_list, sep=', ')} : "
+            f"{nonestr(self.mode, post=' ')}{self.subtype_indication}{nonestr(self.default, pre=' := ')}"
         )
 
 
@@ -877,12 +898,8 @@ class InterfaceVariableDeclaration(_VhdlCstNode):
 
     def format(self):
         return (
-            nonestr(self.VARIABLE, post=" ")
-            + nonestr(self.identifier_list, sep=", ")
-            + " : "
-            + nonestr(self.mode, post=" ")
-            + str(self.subtype_indication)
-            + nonestr(self.default, pre=" := ")
+            f"{nonestr(self.VARIABLE, post=' ')}{nonestr(self.identifier_list, sep=', ')} : "
+            f"{nonestr(self.mode, post=' ')}{self.subtype_indication}{nonestr(self.default, pre=' := ')}"
         )
 
 
@@ -896,12 +913,8 @@ class InterfaceConstantDeclaration(_VhdlCstNode):
 
     def format(self):
         return (
-            nonestr(self.CONSTANT, post=" ")
-            + nonestr(self.identifier_list, sep=", ")
-            + " : "
-            + nonestr(self.mode, post=" ")
-            + str(self.subtype_indication)
-            + nonestr(self.default, pre=" := ")
+            f"{nonestr(self.CONSTANT, post=' ')}{nonestr(self.identifier_list, sep=', ')} : "
+            f"{nonestr(self.mode, post=' ')}{self.subtype_indication}{nonestr(self.default, pre=' := ')}"
         )
 
 
@@ -921,7 +934,7 @@ class InterfacePackageGenericMapAspect(_VhdlCstNode):
         if isinstance(self.aspect, Token):
             return f"generic map ({self.aspect})"
         else:
-            return f"{self.aspect}"
+            return str(self.aspect)
 
 
 @dataclass
@@ -970,7 +983,7 @@ class InterfaceSubprogramSpecification(_VhdlCstNode):
     aspect: InterfaceProcedureSpecification | InterfaceFunctionSpecification
 
     def format(self):
-        return f"{self.aspect}"
+        return str(self.aspect)
 
 
 @dataclass
@@ -978,7 +991,7 @@ class InterfaceSubprogramDefault(_VhdlCstNode):
     name: Name | Token
 
     def format(self):
-        return f"{self.name}"
+        return str(self.name)
 
 
 @dataclass
@@ -1009,9 +1022,7 @@ class InterfaceFileDeclaration(_VhdlCstNode):
     subtype_indication: SubtypeIndication
 
     def format(self):
-        return (
-            f"file {nonestr(self.identifier_list, sep=', ')}" + " : " + str(self.subtype_indication)
-        )
+        return f"file {nonestr(self.identifier_list, sep=', ')} : {self.subtype_indication}"
 
 
 @dataclass
@@ -1031,11 +1042,8 @@ class FileDeclaration(_VhdlCstNode):
 
     def format(self):
         return (
-            f"file {nonestr(self.identifier_list, sep=', ')}"
-            + " : "
-            + str(self.subtype_indication)
-            + nonestr(self.open_info, pre=" ")
-            + ";"
+            f"file {nonestr(self.identifier_list, sep=', ')} : {self.subtype_indication}"
+            f"{nonestr(self.open_info, pre=' ')};"
         )
 
 
@@ -1098,7 +1106,7 @@ class EntityDeclarativeItem(_VhdlCstNode):
     )
 
     def format(self):
-        return f"{self.item}"
+        return str(self.item)
 
 
 @dataclass
@@ -1106,7 +1114,7 @@ class EntityStatement(_VhdlCstNode):
     item: ConcurrentAssertionStatement
 
     def format(self):
-        return f"{self.item}"
+        return str(self.item)
 
 
 @dataclass
@@ -1140,12 +1148,9 @@ class EntityDeclaration(_VhdlCstNode):
     def format(self):
         return (
             f"entity {self.identifier} is\n{self.entity_header}\n"
-            + nonestr(self.entity_declarative_part, sep="\n", post="\n")
-            + nonestr(self.entity_statement_part, pre="begin\n", post="\n")
-            + "end"
-            + nonestr(self.ENTITY, pre=" ")
-            + nonestr(self.element_simple_name, pre=" ")
-            + ";\n"
+            f"{nonestr(self.entity_declarative_part, sep=nl, post=nl)}"
+            f"{nonestr(self.entity_statement_part, pre=f'begin{nl}', post=nl)}"
+            f"end{nonestr(self.ENTITY, pre=' ')}{nonestr(self.element_simple_name, pre=' ')};\n"
         )
 
 
@@ -1208,7 +1213,7 @@ class FormalPartNameOnly(_VhdlCstNode):
     formal: Name
 
     def format(self):
-        return f"{self.formal}"
+        return str(self.formal)
 
 
 @dataclass
@@ -1248,7 +1253,7 @@ class ActualPartNameOnly(_VhdlCstNode):
     actual: ActualDesignator
 
     def format(self):
-        return f"{self.actual}"
+        return str(self.actual)
 
 
 @dataclass
@@ -1325,12 +1330,7 @@ class ConstrainedArrayDefinition(_VhdlCstNode):
         return f"array{nonestr(self.index_constraint)} of {self.subtype_indication}"
 
 
-@dataclass
-class ArrayTypeDefinition(_VhdlCstNode):
-    definition: UnboundedArrayDefinition | ConstrainedArrayDefinition
-
-    def format(self):
-        return str(self.definition)
+ArrayTypeDefinition: TypeAlias = UnboundedArrayDefinition | ConstrainedArrayDefinition
 
 
 @dataclass
@@ -1351,12 +1351,7 @@ class RecordTypeDefinition(_VhdlCstNode):
         return f"record\n{nonestr(self.declarations, sep=nl)}\nend record{nonestr(self.record_type_simple_name, pre=' ')}"
 
 
-@dataclass
-class CompositeTypeDefinition(_VhdlCstNode):
-    definition: ArrayTypeDefinition | RecordTypeDefinition
-
-    def format(self):
-        return str(self.definition)
+CompositeTypeDefinition: TypeAlias = ArrayTypeDefinition | RecordTypeDefinition
 
 
 @dataclass
@@ -1398,12 +1393,9 @@ class PhysicalTypeDefinition(_VhdlCstNode):
 IntegerTypeDefinition: TypeAlias = RangeConstraint
 FloatingTypeDefinition: TypeAlias = RangeConstraint
 
-@dataclass
-class ScalarTypeDefinition(_VhdlCstNode):
-    definition: EnumerationTypeDefinition | IntegerTypeDefinition | FloatingTypeDefinition | PhysicalTypeDefinition
-
-    def format(self):
-        return str(self.definition)
+ScalarTypeDefinition: TypeAlias = (
+    EnumerationTypeDefinition | IntegerTypeDefinition | FloatingTypeDefinition | PhysicalTypeDefinition
+)
 
 
 @dataclass
@@ -1427,7 +1419,7 @@ class EntityTag(_VhdlCstNode):
     tag: Identifier | CharacterLiteral | Token
 
     def format(self):
-        return f"{self.tag}"
+        return str(self.tag)
 
 
 @dataclass
@@ -1444,7 +1436,7 @@ class EntityClass(_VhdlCstNode):
     entity_class: Token
 
     def format(self):
-        return f"{self.entity_class}"
+        return str(self.entity_class)
 
 
 @dataclass
@@ -1515,12 +1507,7 @@ class ProtectedTypeBody(_VhdlCstNode):
         )
 
 
-@dataclass
-class ProtectedTypeDefinition(_VhdlCstNode):
-    definition: ProtectedTypeDeclaration | ProtectedTypeBody
-
-    def format(self):
-        return f"{self.definition}"
+ProtectedTypeDefinition: TypeAlias = ProtectedTypeDeclaration | ProtectedTypeBody
 
 
 @dataclass
@@ -1976,7 +1963,7 @@ class ConditionalWaveforms(_VhdlCstNode):
 
     def format(self):
         vec = [
-            f"else {w} when {c}" for w, c in zip(self.conditionals[0::2], self.conditionals[1::2])
+            f"else {w} when {c}" for w, c in groups(self.conditionals)
         ]
         return f"{self.waveform} when {self.condition}{nonestr(vec, sep=nl)}{nonestr(self.else_waveform, pre=' else ')}"
 
@@ -2044,7 +2031,7 @@ class Target(_VhdlCstNode):
     target: Name | Aggregate
 
     def format(self):
-        return f"{self.target}"
+        return str(self.target)
 
 
 @dataclass
@@ -2052,7 +2039,7 @@ class TransportDelayMechanism(_VhdlCstNode):
     type: Token
 
     def format(self):
-        return f"{self.type}"
+        return str(self.type)
 
 
 @dataclass
@@ -2140,7 +2127,7 @@ class SelectedWaveformAssignment(_VhdlCstNode):
             if not self.selected_waveforms
             else [
                 f"{w} when {c}"
-                for w, c in zip(self.selected_waveforms[0::2], self.selected_waveforms[1::2])
+                for w, c in groups(self.selected_waveforms)
             ]
         )
         return f"with {self.expression} select{nonestr(self.QMARK, pre=' ')} {self.target} <={nonestr(self.delay_mechanism, pre=' ')} {nonestr(selexpr, sep=', ')};"
@@ -2160,7 +2147,7 @@ class SelectedForceAssignment(_VhdlCstNode):
             if not self.selected_expressions
             else [
                 f"{e} when {c}"
-                for e, c in zip(self.selected_expressions[0::2], self.selected_expressions[1::2])
+                for e, c in groups(self.selected_expressions)
             ]
         )
         return f"with {self.expression} select{nonestr(self.QMARK, pre=' ')} {self.target} <= force{nonestr(self.force_mode, pre=' ')} {nonestr(selexpr, sep=', ')};"
@@ -2199,7 +2186,7 @@ class ConditionalExpression(_VhdlCstNode):
             if not self.else_list
             else [
                 f"else {e} when {c}"
-                for e, c in zip(self.else_list[0::2], self.else_list[1::2])
+                for e, c in groups(self.else_list)
             ]
         )
         return f"{self.when_expr} when {self.condition}{nonestr(elsif, sep=nl, pre=' ', post=nl)}{nonestr(self.else_expr, pre=' else ')};"
@@ -2227,7 +2214,7 @@ class SelectedVariableAssignment(_VhdlCstNode):
             if not self.selected_expressions
             else [
                 f"{e} when {c}"
-                for e, c in zip(self.selected_expressions[0::2], self.selected_expressions[1::2])
+                for e, c in groups(self.selected_expressions)
             ]
         )
         return f"with {self.expression} select{nonestr(self.QMARK, pre=' ')} {self.target} := {nonestr(selexpr, sep=', ')};"
@@ -2259,7 +2246,7 @@ class IfStatement(_VhdlCstNode):
             if not self.elsif_branches
             else [
                 f"elsif {c} then\n{nonestr(s, sep=nl)}"
-                for c, s in zip(self.elsif_branches[0::2], self.elsif_branches[1::2])
+                for c, s in groups(self.elsif_branches)
             ]
         )
         return f"{nonestr(self.label, post=': ')}if {self.condition} then\n{nonestr(self.if_branch_statements, post=nl, sep=nl)}{nonestr(elsif, sep=nl, post=nl)}{nonestr(self.else_branch_statements, pre='else'+nl, sep=nl, post=nl)}end if{nonestr(self.label_end, pre=' ')};"
@@ -2272,7 +2259,7 @@ class CaseStatementAlternative(_VhdlCstListNode):
     def format(self):
         vec = [
             f"when {c} =>{nonestr(s, sep=nl, pre=nl)}"
-            for c, s in zip(self.alternatives[0::2], self.alternatives[1::2])
+            for c, s in groups(self.alternatives)
         ]
         return nonestr(vec, sep=nl, post=nl)
 
@@ -2389,7 +2376,7 @@ class IterationScheme(_VhdlCstNode):
     spec: Expression | ParameterSpecification
 
     def format(self):
-        if isinstance(self.spec, Expression):
+        if type(self.spec) in EXPRESSION_TYPES:
             return f"while {self.spec}"
         else:
             return f"for {self.spec}"
@@ -2445,26 +2432,21 @@ class NullStatement(_VhdlCstNode):
         return f"{nonestr(self.label, post=': ')}null;"
 
 
-@dataclass
-class SequentialStatement(_VhdlCstNode):
-    item: (
-        WaitStatement
-        | AssertionStatement
-        | ReportStatement
-        | SignalAssignmentStatement
-        | VariableAssignmentStatement
-        | ProcedureCallStatement
-        | IfStatement
-        | CaseStatement
-        | LoopStatement
-        | NextStatement
-        | ExitStatement
-        | ReturnStatement
-        | NullStatement
-    )
-
-    def format(self):
-        return str(self.item)
+SequentialStatement: TypeAlias = (
+    WaitStatement
+    | AssertionStatement
+    | ReportStatement
+    | SignalAssignmentStatement
+    | VariableAssignmentStatement
+    | ProcedureCallStatement
+    | IfStatement
+    | CaseStatement
+    | LoopStatement
+    | NextStatement
+    | ExitStatement
+    | ReturnStatement
+    | NullStatement
+)
 
 
 @dataclass
@@ -2621,7 +2603,7 @@ class IfGenerateStatement(_VhdlCstNode):
             if not self.elsif_branches
             else [
                 f"elsif {nonestr(l, post=': ')}{c} generate\n{nonestr(b, sep=nl)}"
-                for l, c, b in zip(self.elsif_branches[0::3], self.elsif_branches[1::3], self.elsif_branches[2::3])
+                for l, c, b in groups(self.elsif_branches, 3)
             ]
         )
         return (
@@ -2813,8 +2795,23 @@ class DesignUnit(_VhdlCstNode):
         return nonestr(self.context_clause, post="\n") + str(self.library_unit)
 
 
+# base class for the root node of a parsed file
+# rendering a whole file is expensive and the tree isn't modified after parsing, so the text is kept after the first call
+@dataclass
+class _VhdlCstFileNode(_VhdlCstListNode):
+    # files also carry their path, so they need the generic version
+    children = _VhdlCstNode.children
+
+    def __str__(self):
+        try:
+            return self._rendered
+        except AttributeError:
+            self._rendered = self.format()
+            return self._rendered
+
+
 @dataclass
-class DesignFile(_VhdlCstListNode):
+class DesignFile(_VhdlCstFileNode):
     design_units: List[DesignUnit]
     path: Optional[Path] = None
 
@@ -2832,7 +2829,7 @@ class ToolDirective(_VhdlCstNode):
 
 
 @dataclass
-class EncryptedDesignFile(_VhdlCstListNode):
+class EncryptedDesignFile(_VhdlCstFileNode):
     directives: List[ToolDirective | Token]
     path: Optional[Path] = None
 
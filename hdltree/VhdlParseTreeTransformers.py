@@ -10,23 +10,53 @@ class Tokens(Transformer):
 
 
 class AddCstParent(Visitor):
-    def __default__(self, tree):
-        for child in tree.children:
-            if isinstance(child, ast_utils.Ast):
-                assert not hasattr(child, "parent")
-                child.parent = tree
-            elif isinstance(child, list):
-                for listchild in child:
-                    listchild.parent = tree
-            elif child is None:
-                pass
-            elif isinstance(child, Token):
-                pass
-            elif isinstance(child, Meta):
-                pass
-            else:
-                print(type(child))
-                raise Exception("bad! check this code!")
+    # set the parents while walking the tree once with an explicit stack, instead of lark's Visitor listing
+    # every subtree first and then getting the children of each of them again to visit it
+    def visit(self, tree):
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            for child in node.children:
+                if isinstance(child, ast_utils.Ast):
+                    assert not hasattr(child, "parent")
+                    child.parent = node
+                    stack.append(child)
+                elif isinstance(child, list):
+                    for listchild in child:
+                        listchild.parent = node
+                elif child is None:
+                    pass
+                elif isinstance(child, Token):
+                    pass
+                elif isinstance(child, Meta):
+                    pass
+                else:
+                    print(type(child))
+                    raise Exception("bad! check this code!")
+        return tree
+
+
+# equivalent to Transformer.transform with handlers looked up by rule name, but walks the tree with an
+# explicit stack instead of recursing through lark's generic dispatch, which tries getattr on every node
+def transform_tree(tree, handlers):
+    stack = [(tree, iter(tree.children), [])]
+    while True:
+        node, it, children = stack[-1]
+        for c in it:
+            if isinstance(c, Tree):
+                stack.append((c, iter(c.children), []))
+                break
+            children.append(c)
+        else:
+            stack.pop()
+            handler = handlers.get(node.data)
+            res = Tree(node.data, children, node.meta)
+            if handler is not None:
+                res = handler(res)
+            if not stack:
+                return None if res is Discard else res
+            if res is not Discard:
+                stack[-1][2].append(res)
 
 
 def is_deleteable(tree):
@@ -61,6 +91,9 @@ class CollapseAmbig(Transformer):
     def _ambig(self, children):
         return Tree(children[0].data, children[0].children)
 
+    def transform(self, tree):
+        return transform_tree(tree, {"_ambig": lambda t: self._ambig(t.children)})
+
 
 class MakeAmbigUnique(Transformer):
     #def __default__(self, data, children, meta):
@@ -77,6 +110,10 @@ class MakeAmbigUnique(Transformer):
     def __init__(self, project=None):
         self.project = project
 
+    def transform(self, tree):
+        return transform_tree(
+            tree, {"_ambig": self._ambig, "physical_literal": self.physical_literal}
+        )
 
     @v_args(tree=True)
     def _ambig(self, tree):
@@ -116,3 +153,17 @@ class MakeAmbigUnique(Transformer):
         if unit not in units:
             tree.to_delete = True
         return tree
+
+
+# MakeAmbigUnique followed by CollapseAmbig in a single walk, keeping the first unique branch
+class MakeAmbigUniqueAndCollapse(MakeAmbigUnique):
+    def transform(self, tree):
+        return transform_tree(
+            tree, {"_ambig": self._collapse_ambig, "physical_literal": self.physical_literal}
+        )
+
+    def _collapse_ambig(self, tree):
+        res = self._ambig(tree)
+        if res is not Discard and res.data == "_ambig":
+            res = Tree(res.children[0].data, res.children[0].children)
+        return res
@@ -88,6 +88,11 @@ def main():
         action="store_false",
         help="Don't use the regex library",
     )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache parse results in ~/.cache/hdltree to skip parsing unchanged files",
+    )
     parser.add_argument(
         "--cst",
         action="store_true",
@@ -120,15 +125,30 @@ def main():
 
     files = Parser.collect_files(args.input, args.exclude)
 
-    proj = Analyzer.Project(args.ambig, args.no_regex, debug_lark=args.debug_lark, add_std=args.std)
-    proj.add_library("src")
-    for f in files:
-        proj.add_file("src", f, args.cst, args.debug)
+    proj = Analyzer.Project(
+        args.ambig,
+        args.no_regex,
+        debug_lark=args.debug_lark,
+        add_std=args.std,
+        cache=args.cache,
+        workers=None,
+    )
+    lib = proj.add_library("src")
+    if args.cst or args.debug:
+        for f in files:
+            proj.add_file(lib, f, args.cst, args.debug)
+    else:
+        # nothing to report per file, so parse them all in parallel
+        try:
+            for cst in proj.parser.parse_files(files):
+                lib.add_cst(cst)
+        except Parser.ParseFileError as e:
+            print(e)
+            raise SystemExit(1)
 
     if args.ast:
         print()
-        con = Console(emoji=False)
-        con.print(proj.rich_tree())
+        proj.render_to(Console(emoji=False))
 
     if args.simple:
         print()
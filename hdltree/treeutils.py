@@ -0,0 +1,85 @@
+from functools import lru_cache
+from pathlib import PurePath
+from sys import modules
+import re
+
+from rich.text import Text
+
+# helpers for printing the CST and the analyzer tree, shared so both use the same caches
+
+CAMEL_RE = re.compile(r"([a-z])([A-Z])")
+
+
+# only ever called with class names, so the cache stays small
+@lru_cache(maxsize=None)
+def camel2snake(name):
+    return CAMEL_RE.sub(r"\1_\2", name).lower()
+
+
+# the type strings passed to these come from the field annotations of a fixed set of classes,
+# so the regex work is only done once for each of them
+OPTIONAL_RE = re.compile(r"Optional\[(.*)\]")
+TYPING_RE = re.compile(r"typing\.")
+ALIAS_RE = re.compile(r"{ .* = (.*) }")
+LIST_RE = re.compile(r"List\[(.*)\]")
+
+
+# expanded form of everything in a module that isn't a class, which covers the type aliases.
+# built on first use since the aliases are defined all through the module
+@lru_cache(maxsize=None)
+def alias_table(module_name):
+    module_re = re.compile(f"{module_name}\\.")
+    table = {}
+    for name, aliastype in vars(modules[module_name]).items():
+        if not isinstance(aliastype, type):  # get_origin(uniontype):
+            # chop off the module name and prepend the alias name
+            nopre = TYPING_RE.sub("", str(aliastype))
+            nopre = module_re.sub("", nopre)
+            table[name] = f"{{ {name} = " + nopre + " }"
+    return table
+
+
+# expand the aliases of the module the annotation comes from
+@lru_cache(maxsize=None)
+def deref_type(rawtype, module_name):
+    aliases = alias_table(module_name)
+    return " | ".join(aliases.get(rt, rt) for rt in rawtype.split(" | "))
+
+
+# type of the items of a list field
+@lru_cache(maxsize=None)
+def list_item_type(rawtype, module_name):
+    return LIST_RE.sub(r"\1", ALIAS_RE.sub(r"\1", deref_type(rawtype, module_name)))
+
+
+# take the full type hint of the field and underline the actual type of the object in the field
+def annotate_type(field_type, obj):
+    # set search pattern
+    if obj is None:
+        pat = r"\b(None)\b"
+    elif isinstance(obj, list):
+        pat = r"(List\[.*\])"
+    else:
+        pat = type_pattern(type(obj))
+    return underline_type(field_type, pat)
+
+
+@lru_cache(maxsize=None)
+def type_pattern(cls):
+    # fields holding any of the pathlib classes are annotated as Path
+    t = "Path" if issubclass(cls, PurePath) else cls.__name__
+    return r"\b(" + t + r")\b"
+
+
+@lru_cache(maxsize=None)
+def underline_type(field_type, pat):
+    # remove Optional wrapper used for rules with multiple branches with different numbers of subrules/tokens and not using a Union alias
+    noopt = OPTIONAL_RE.sub(r"\1", field_type)
+    return re.sub(pat, r"[underline]\1[/underline]", noopt)
+
+
+# the same labels come up over and over in a tree, so only parse the markup once per label.
+# rich renders tree labels without highlighting, and the consoles used to print these have emoji=False
+@lru_cache(maxsize=4096)
+def rich_label(markup):
+    return Text.from_markup(markup, emoji=False)